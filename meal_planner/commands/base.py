@@ -185,7 +185,12 @@ class CommandContext:
     def save_workspace(self):
         """Save planning workspace to disk (auto-save)."""
         if self.workspace_mgr:
-            workspace_data = self.workspace_mgr.convert_from_planning_workspace(self.planning_workspace)
+            # Current non-meal sections (history, inventory, locks); load()
+            # skips the read while the file is still our last save
+            workspace_data = self.workspace_mgr.convert_from_planning_workspace(
+                self.planning_workspace,
+                existing_workspace=self.workspace_mgr.load()
+            )
             self.workspace_mgr.save(workspace_data)
     
     def _initialize_scorers(self):
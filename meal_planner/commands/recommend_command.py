@@ -17,6 +17,8 @@ from meal_planner.generators.history_meal_generator import HistoryMealGenerator
 from meal_planner.models.scoring_context import ScoringContext, MealLocation
 from meal_planner.reports.report_builder import ReportBuilder
 from meal_planner.filters import (
+    CODE_SET_KEY,
+    EMPTY_REASONS,
     NutrientConstraintFilter,
     PreScoreFilter,
     LeftoverMatchFilter,
@@ -1197,9 +1199,10 @@ class RecommendCommand(Command, CommandHistoryMixin):
                 print(f"(Incremental mode - {already_done} already filtered, processing new ones)")
         print()
         
-        # Initialize rejection_reasons tracking on all candidates
+        # Initialize rejection_reasons tracking on all candidates (the
+        # shared placeholder; filters allocate a list on first violation)
         for candidate in candidates_to_filter:
-            candidate["rejection_reasons"] = []
+            candidate["rejection_reasons"] = EMPTY_REASONS
         
         # =========================================================================
         # PHASE 2: EXECUTE FILTERS IN SEQUENCE
@@ -1253,6 +1256,8 @@ class RecommendCommand(Command, CommandHistoryMixin):
         
         for candidate in candidates_to_filter:
             rejection_reasons = candidate.pop("rejection_reasons", [])
+            # Filter-time cache - not JSON-serializable, never saved
+            candidate.pop(CODE_SET_KEY, None)
             
             if rejection_reasons:
                 candidate["filter_result"] = {
@@ -1623,14 +1628,15 @@ class RecommendCommand(Command, CommandHistoryMixin):
             if any_display_flag:
                 print("\nWarning: Display flags ignored for detailed candidate view")
             
-            all_candidates = gen_cands.get("candidates", [])
+            candidate = self.ctx.workspace_mgr.get_generated_candidate(
+                candidate_id, gen_cands
+            )
             
-            for candidate in all_candidates:
-                if candidate.get("id", "").upper() == candidate_id:
-                    # Determine state for display context
-                    list_name = self._determine_candidate_state(candidate)
-                    self._show_candidate_detail(candidate, meal_type, list_name)
-                    return
+            if candidate is not None:
+                # Determine state for display context
+                list_name = self._determine_candidate_state(candidate)
+                self._show_candidate_detail(candidate, meal_type, list_name)
+                return
             
             # Not found
             print(f"\nCandidate {candidate_id} not found")
@@ -2975,12 +2981,10 @@ class RecommendCommand(Command, CommandHistoryMixin):
             print()
             return
         
-        # Find the candidate
-        candidate = None
-        for c in scored_candidates:
-            if c.get("id", "").upper() == g_id:
-                candidate = c
-                break
+        # Find the candidate (must be scored)
+        candidate = self.ctx.workspace_mgr.get_generated_candidate(g_id, gen_cands)
+        if candidate is not None and candidate.get("score_result") is None:
+            candidate = None
         
         if not candidate:
             print(f"\nCandidate '{g_id}' not found in scored candidates")
@@ -3506,30 +3510,32 @@ class RecommendCommand(Command, CommandHistoryMixin):
             items = candidate.get("items", [])
             candidate["totals"] = self._calculate_candidate_totals(items)
         
-        self.ctx.workspace_mgr.set_generated_candidates(
-            meal_type=meal_key,
-            raw_candidates=candidates,
-            cursor=0,
-            append=False
-        )
-        
-        # Load reco workspace
-        reco_workspace = self.ctx.workspace_mgr.load_reco()
-        
-        # Set candidates (history generation replaces, not appends)
-        if "generated_candidates" not in reco_workspace:
-            reco_workspace["generated_candidates"] = {}
-        
-        # Update generation state
-        reco_workspace["generation_state"] = {
-            "method": "history",
-            "meal_type": meal_key,
-            "template_name": template_name,
-            "cursor": len(candidates)
-        }
-        
-        # Save once
-        self.ctx.workspace_mgr.save_reco(reco_workspace)
+        # One reco load/save for candidates + generation state
+        with self.ctx.workspace_mgr.transaction():
+            self.ctx.workspace_mgr.set_generated_candidates(
+                meal_type=meal_key,
+                raw_candidates=candidates,
+                cursor=0,
+                append=False
+            )
+            
+            # Load reco workspace
+            reco_workspace = self.ctx.workspace_mgr.load_reco()
+            
+            # Set candidates (history generation replaces, not appends)
+            if "generated_candidates" not in reco_workspace:
+                reco_workspace["generated_candidates"] = {}
+            
+            # Update generation state
+            reco_workspace["generation_state"] = {
+                "method": "history",
+                "meal_type": meal_key,
+                "template_name": template_name,
+                "cursor": len(candidates)
+            }
+            
+            # Save once
+            self.ctx.workspace_mgr.save_reco(reco_workspace)
 
         # Display results
         print(f"\nGenerated {len(candidates)} raw candidates for {meal_key}")
@@ -3576,24 +3582,26 @@ class RecommendCommand(Command, CommandHistoryMixin):
             items = candidate.get("items", [])
             candidate["totals"] = self._calculate_candidate_totals(items)
 
-        self.ctx.workspace_mgr.set_generated_candidates(
-            meal_type=meal_key,
-            raw_candidates=candidates,
-            cursor=cursor,
-            append=(cursor > 0)
-        )
+        # One reco load/save for candidates + generation state
+        with self.ctx.workspace_mgr.transaction():
+            self.ctx.workspace_mgr.set_generated_candidates(
+                meal_type=meal_key,
+                raw_candidates=candidates,
+                cursor=cursor,
+                append=(cursor > 0)
+            )
 
-        reco_workspace = self.ctx.workspace_mgr.load_reco()
+            reco_workspace = self.ctx.workspace_mgr.load_reco()
 
-        reco_workspace["generation_state"] = {
-            "method": "exhaustive",
-            "meal_type": meal_key,
-            "cursor": new_cursor,
-            "template_name": template_name
-        }
+            reco_workspace["generation_state"] = {
+                "method": "exhaustive",
+                "meal_type": meal_key,
+                "cursor": new_cursor,
+                "template_name": template_name
+            }
 
-        # Save reco workspace once with everything
-        self.ctx.workspace_mgr.save_reco(reco_workspace)
+            # Save reco workspace once with everything
+            self.ctx.workspace_mgr.save_reco(reco_workspace)
 
         # Display results
         print(f"Generated {len(candidates)} candidates (positions {cursor}-{new_cursor-1})")
@@ -87,6 +87,7 @@ class MasterLoader:
         self._master_dict = None  # Source of truth: dict keyed by code
         self._df = None           # Derived view: flattened DataFrame
         self._cols = None
+        self._code_index = None   # Uppercase code -> df row, built on first lookup
 
     def load(self) -> pd.DataFrame:
         """
@@ -115,6 +116,19 @@ class MasterLoader:
         if self._cols is None:
             self.load()
         return self._cols
+    
+    @property
+    def code_index(self) -> Dict[str, int]:
+        """
+        Get the uppercase code -> DataFrame row position map.
+        
+        Built on first use and rebuilt after every DataFrame rebuild; the
+        first row wins for a code that appears twice. Callers must not
+        modify it.
+        """
+        if self._code_index is None:
+            self._build_code_index()
+        return self._code_index
 
     @property
     def nutrients_df(self) -> pd.DataFrame:
@@ -190,16 +204,25 @@ class MasterLoader:
             >>> row = loader.lookup_code("B.1")
             >>> print(row['option'], row['cal'])
         """
-        code_upper = code.upper()
-        code_col = self.cols.code
-        
         # Case-insensitive match
-        match = self.df[self.df[code_col].str.upper() == code_upper]
-        
-        if match.empty:
+        row = self.code_index.get(code.upper())
+        if row is None:
             return None
         
-        return match.iloc[0].to_dict()
+        return self.df.iloc[row].to_dict()
+    
+    def _build_code_index(self) -> None:
+        """
+        Map each uppercase code to its DataFrame row (see code_index).
+        
+        Rebuilt after every DataFrame rebuild; the first row wins for a
+        code that appears twice.
+        """
+        df = self.df
+        index = {}
+        for row, code in enumerate(df[self.cols.code].astype(str).str.upper()):
+            index.setdefault(code, row)
+        self._code_index = index
     
     def search(self, term: str) -> pd.DataFrame:
         """
@@ -377,6 +400,8 @@ class MasterLoader:
         fat_g, GI, GL, sugar_g, fiber_g, sodium_mg, potassium_mg, vitA_mcg, vitC_mg, 
         iron_mg, recipe, date_added, portion
         """
+        self._code_index = None
+        
         if not self._master_dict:
             self._df = pd.DataFrame()
             self._cols = None
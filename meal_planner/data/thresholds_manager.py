@@ -7,7 +7,7 @@ externalized for user configuration.
 """
 import json
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, FrozenSet
 
 
 class ThresholdsManager:
@@ -29,6 +29,9 @@ class ThresholdsManager:
         self._thresholds: Optional[Dict[str, Any]] = None
         self._validation_errors: List[str] = []
         self._is_valid = False
+        # pool name -> lowercased codes (see expand_pool_codes), reset
+        # on every load()
+        self._pool_cache: Dict[str, FrozenSet[str]] = {}
     
     def load(self) -> bool:
         """
@@ -40,6 +43,7 @@ class ThresholdsManager:
         self._validation_errors.clear()
         self._is_valid = False
         self._thresholds = None
+        self._pool_cache = {}
         
         # Check file exists
         if not self.filepath.exists():
@@ -1519,6 +1523,25 @@ class ThresholdsManager:
         
         return expand_recursive(pool_name)
     
+    def expand_pool_codes(self, pool_name: str) -> FrozenSet[str]:
+        """
+        Expand a component pool to lowercased food codes, for rule matching.
+        
+        Cached until the next load(), so every filter and meal type
+        referencing a pool shares one frozenset.
+        
+        Args:
+            pool_name: Name of pool to expand
+        
+        Returns:
+            Frozen set of lowercase food codes (empty if pool not found)
+        """
+        codes = self._pool_cache.get(pool_name)
+        if codes is None:
+            codes = frozenset(code.lower() for code in self.expand_pool(pool_name))
+            self._pool_cache[pool_name] = codes
+        return codes
+    
     def validate_food_codes(self, master_loader) -> List[str]:
         """
         Validate that all food codes in component pools exist in master.csv.
@@ -3,16 +3,36 @@
 User preferences manager/
 """
 import json
+import re
+import sys
 from pathlib import Path
-from typing import Optional, Dict, Any, List
-from datetime import date, timedelta
-import pandas as pd
+from typing import Optional, Dict, Any, List, FrozenSet
+
+
+def _norm(code: Any) -> str:
+    """
+    Normalize a food code to its canonical interned form.
+    
+    Interning means every occurrence of the same code shares one
+    string object, so set/dict lookups hash it once.
+    
+    Args:
+        code: Food code (any type, converted with str())
+    
+    Returns:
+        Uppercase, stripped, interned code
+    """
+    return sys.intern(str(code).upper().strip())
+
 
 class UserPreferencesManager:
     """
     Manages user-specific food preferences and inventory.
     
     Handles:
+    - Command history size
+    - Recommendation exclusions (items and prefix patterns)
+    - Meal time boundaries
     """
     
     def __init__(self, filepath: Path, log_manager=None):
@@ -27,26 +47,45 @@ class UserPreferencesManager:
         self.log_manager = log_manager
         self._prefs: Optional[Dict[str, Any]] = None
         self._validation_errors: List[str] = []
+        # st_mtime_ns of the file backing self._prefs (None = not loaded)
+        self._loaded_mtime_ns: Optional[int] = None
+        
+        # Normalized lookup structures, rebuilt on every load
+        self._exclude_items: FrozenSet[str] = frozenset()
+        self._exclude_pattern_re: Optional[re.Pattern] = None
     
     def load(self) -> bool:
         """
         Load and validate user preferences from disk.
         
+        Skips re-reading the file when it has not been modified since
+        the last successful load, so callers can invoke this freely.
+        
         Returns:
             True if loaded successfully, False otherwise
         """
-        self._validation_errors.clear()
-        self._prefs = None
-        
         # Check file exists
-        if not self.filepath.exists():
+        try:
+            st = self.filepath.stat()
+        except FileNotFoundError:
             self._create_default_file()
             return self.load()  # Retry after creating default
         
-        # Load JSON
+        # Fast path: file unchanged since last successful load
+        if self._prefs is not None and st.st_mtime_ns == self._loaded_mtime_ns:
+            return True
+        
+        self._validation_errors.clear()
+        self._prefs = None
+        self._loaded_mtime_ns = None
+        self._exclude_items = frozenset()
+        self._exclude_pattern_re = None
+        
+        # Load JSON - one binary read, decoded by json.loads (skips the
+        # text-mode wrapper; UTF-8 with or without BOM is detected)
         try:
-            with open(self.filepath, 'r', encoding='utf-8') as f:
-                self._prefs = json.load(f)
+            with open(self.filepath, 'rb') as f:
+                self._prefs = json.loads(f.read())
         except json.JSONDecodeError as e:
             self._validation_errors.append(f"Invalid JSON: {e}")
             return False
@@ -56,7 +95,9 @@ class UserPreferencesManager:
         
         # Validate structure (lenient - warnings only)
         self._validate_structure()
+        self._build_lookups()
         
+        self._loaded_mtime_ns = st.st_mtime_ns
         return True
     
     @property
@@ -108,6 +149,48 @@ class UserPreferencesManager:
         else:
             return 10
 
+    def is_excluded_from_recommendations(self, code: str) -> bool:
+        """
+        Check if a food code is excluded from recommendations.
+        
+        Matches exact items and prefix patterns (e.g. "DN.") from the
+        exclude_from_recommendations section.
+        
+        Args:
+            code: Food code (uppercase, as stored in candidates)
+        
+        Returns:
+            True if the code must not be recommended
+        """
+        if code in self._exclude_items:
+            return True
+        
+        return (self._exclude_pattern_re is not None
+                and self._exclude_pattern_re.match(code) is not None)
+
+    def _build_lookups(self) -> None:
+        """Pre-normalize code lists from preferences into lookup structures."""
+        if not isinstance(self._prefs, dict):
+            return
+        
+        exclude_config = self._prefs.get('exclude_from_recommendations', {})
+        if not isinstance(exclude_config, dict):
+            return
+        
+        self._exclude_items = frozenset(
+            _norm(item) for item in exclude_config.get('items', [])
+        )
+        # Only "XX."-style prefix patterns are supported; compile them into
+        # a single anchored alternation so matching is one C-level call
+        patterns = sorted({
+            _norm(pattern) for pattern in exclude_config.get('patterns', [])
+            if str(pattern).endswith(".")
+        })
+        if patterns:
+            self._exclude_pattern_re = re.compile(
+                '(?:' + '|'.join(map(re.escape, patterns)) + ')'
+            )
+
     # =========================================================================
     # Validation
     # =========================================================================
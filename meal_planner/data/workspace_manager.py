@@ -5,10 +5,336 @@ Workspace manager for planning workspace persistence.
 Handles auto-save/load of meal planning workspace to JSON.
 Phase 1: Splits reco data into separate reco_workspace.json file.
 """
+import copy
+import hashlib
 import json
+import mmap
+import os
+import re
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Iterator, Tuple
 from datetime import datetime
+from itertools import islice
+
+try:
+    import orjson  # optional fast JSON codec
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj: Any) -> bytes:
+    """
+    Serialize an object to compact, single-line UTF-8 JSON bytes.
+    
+    Uses orjson when installed, stdlib json otherwise.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _dumps_pretty(obj: Any) -> bytes:
+    """Serialize an object to UTF-8 JSON bytes with a 2-space indent."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _loads(data: bytes) -> Any:
+    """
+    Parse UTF-8 JSON bytes.
+    
+    Uses orjson when installed, stdlib json otherwise. Both raise a
+    json.JSONDecodeError subclass on malformed input.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Meal IDs: "12", "12a" (numeric) or "N3", "N3b" (invented)
+_MEAL_ID_RE = re.compile(r'^(N?)([0-9]+)[a-z]*$')
+
+# Generated candidate IDs: "G1", "G2", ... assigned in list order
+_G_ID_RE = re.compile(r'^G([0-9]+)$')
+
+# Meal fields carried between the workspace and planning formats
+_MEAL_FIELDS = (
+    "description", "analyzed_as", "created", "meal_name", "type",
+    "items", "totals", "source_date", "source_time", "parent_id",
+    "ancestor_id", "modification_log", "meets_constraints", "history",
+    "immutable",
+)
+
+_MEAL_FIELD_SET = frozenset(_MEAL_FIELDS)
+
+# Defaults for missing meal fields (fields not listed default to None)
+_MEAL_DEFAULTS = {
+    "items": [],
+    "totals": {},
+    "modification_log": [],
+    "meets_constraints": True,
+    "history": [],
+    "immutable": False,
+}
+
+
+def _project_meal(source: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy the meal fields out of a meal or planning candidate dict.
+    
+    Fields missing from the source get a fresh copy of their default;
+    fields present (even as None) are kept as-is.
+    
+    Args:
+        source: Meal (workspace format) or candidate (planning format)
+    
+    Returns:
+        New dict with exactly the _MEAL_FIELDS keys
+    """
+    return {
+        field: source[field] if field in source
+        else copy.copy(_MEAL_DEFAULTS.get(field))
+        for field in _MEAL_FIELDS
+    }
+
+
+def _generation_metadata(raw_cand: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+    """
+    Build a generated candidate's generation_metadata dict.
+    
+    Args:
+        raw_cand: Raw generated candidate
+        timestamp: Generation timestamp shared by the batch
+    
+    Returns:
+        Metadata with method, timestamp and template_info if present
+    """
+    gen_metadata = {
+        "method": raw_cand.get("generation_method", "unknown"),
+        "timestamp": timestamp
+    }
+    if "template_info" in raw_cand:
+        gen_metadata["template_info"] = raw_cand["template_info"]
+    return gen_metadata
+
+
+def _count_candidates(gen_cands: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Count raw, filtered (passed) and scored generated candidates.
+    
+    Args:
+        gen_cands: Generated candidates section, or None
+    
+    Returns:
+        Dict with "raw", "filtered" and "scored" counts
+    """
+    candidates = gen_cands.get("candidates", []) if gen_cands else []
+    
+    filtered = 0
+    scored = 0
+    for c in candidates:
+        # filter_result/score_result are None until filtered/scored
+        filter_result = c.get("filter_result")
+        if filter_result and filter_result.get("passed", False):
+            filtered += 1
+        if c.get("score_result") is not None:
+            scored += 1
+    
+    return {"raw": len(candidates), "filtered": filtered, "scored": scored}
+
+
+def _strip_meal_defaults(meal: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy of a meal without the fields that hold their default value.
+    
+    Used when saving; most meals carry None parents, empty logs and the
+    default flags, which needn't be written out for every meal.
+    
+    Args:
+        meal: Meal dict (not modified)
+    
+    Returns:
+        New dict with default-valued meal fields omitted
+    """
+    stripped = {}
+    for field, value in meal.items():
+        if field in _MEAL_FIELD_SET:
+            default = _MEAL_DEFAULTS.get(field)
+            if value == default and type(value) is type(default):
+                continue
+        stripped[field] = value
+    return stripped
+
+
+def _rehydrate_meals(meals: Dict[str, Any]) -> None:
+    """
+    Restore meal fields omitted by _strip_meal_defaults, in place.
+    
+    Args:
+        meals: Workspace meals dict
+    """
+    for meal in meals.values():
+        if not isinstance(meal, dict):
+            continue
+        for field in _MEAL_FIELDS:
+            if field not in meal:
+                meal[field] = copy.copy(_MEAL_DEFAULTS.get(field))
+
+
+# Sections of the main workspace with their required sub-sections;
+# anything missing is filled in from here on load
+_DEFAULT_SCHEMA = {
+    "meals": {},
+    "command_history": {
+        "threshold": {},
+        "analyze": {},
+        "recommend": {}
+    },
+    "inventory": {
+        "leftovers": {},
+        "batch": {},
+        "rotating": {}
+    },
+    "locks": {
+        "include": {},
+        "exclude": []
+    }
+}
+
+# Same for the reco workspace
+_RECO_SCHEMA = {
+    "generated_candidates": {},
+    "generation_state": {}
+}
+
+# Pre-encoded copies of the schemas: parsing these gives a fresh empty
+# workspace faster than copy.deepcopy() walks the dicts
+_EMPTY_WORKSPACE_JSON = _dumps(_DEFAULT_SCHEMA)
+_EMPTY_RECO_JSON = _dumps(_RECO_SCHEMA)
+
+
+def _fill_defaults(data: Dict[str, Any], schema: Dict[str, Any]) -> None:
+    """
+    Fill in missing or malformed sections from a schema table, in place.
+    
+    One pass over the table, recursing through nested dicts: a key that
+    is missing, or whose value has a different type than its default
+    (e.g. locks.exclude not a list), gets a deep copy of the default.
+    
+    Args:
+        data: Parsed workspace dict (or a section of one)
+        schema: _DEFAULT_SCHEMA or _RECO_SCHEMA (or a section of one)
+    """
+    for key, default in schema.items():
+        section = data.get(key)
+        if not isinstance(section, type(default)):
+            data[key] = copy.deepcopy(default)
+        elif default and isinstance(default, dict):
+            _fill_defaults(section, default)
+
+
+# Files at least this large are memory-mapped rather than read into a
+# bytes copy (only with orjson, which can parse a buffer in place)
+_MMAP_MIN_BYTES = 64 * 1024
+
+# Errors meaning a workspace file is unreadable or corrupt: I/O errors
+# and malformed JSON or UTF-8
+_READ_ERRORS = (OSError, json.JSONDecodeError, UnicodeDecodeError)
+
+
+def _load_file(path: Path) -> Any:
+    """
+    Read and parse a JSON file.
+    
+    Large files are memory-mapped and parsed straight from the page
+    cache when orjson is available, avoiding a full bytes copy.
+    
+    Args:
+        path: JSON file to read
+    
+    Returns:
+        Parsed JSON value
+    """
+    with open(path, 'rb') as f:
+        if orjson is not None and os.fstat(f.fileno()).st_size >= _MMAP_MIN_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    return orjson.loads(view)
+        return _loads(f.read())
+
+
+def _content_digest(payload: bytes) -> bytes:
+    """
+    Digest of a saved workspace payload, ignoring its timestamp.
+    
+    save() writes last_modified as the final key, so everything before
+    its last occurrence is the workspace content.
+    
+    Args:
+        payload: Serialized workspace
+    
+    Returns:
+        16-byte BLAKE2b digest
+    """
+    end = payload.rfind(b'"last_modified"')
+    with memoryview(payload) as view:
+        return hashlib.blake2b(view[:end] if end >= 0 else view, digest_size=16).digest()
+
+
+# Flags for creating the temp file in _write_atomic (O_BINARY on Windows)
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+
+def _write_atomic(path: Path, payload: bytes) -> None:
+    """
+    Write bytes to a file atomically.
+    
+    The payload goes to a sibling temp file with raw os.write calls
+    (normally a single one), is fsynced, and is then renamed over the
+    destination. A crash mid-write leaves the previous file intact
+    instead of a truncated one.
+    
+    Args:
+        path: Destination file
+        payload: Complete file contents
+    """
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    try:
+        fd = os.open(tmp, _WRITE_FLAGS, 0o644)
+        try:
+            with memoryview(payload) as view:
+                while view:
+                    view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def _file_key(path: Path) -> Optional[Tuple[int, int]]:
+    """
+    Identify the current version of a file by (st_mtime_ns, st_size).
+    
+    Args:
+        path: File to stat
+    
+    Returns:
+        The key, or None if the file is missing or can't be stat'ed
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
 
 
 class WorkspaceManager:
@@ -19,6 +345,12 @@ class WorkspaceManager:
     Reco data is stored separately in reco_workspace.json.
     """
     
+    # History entries kept per plan by append_plan_history (oldest dropped first)
+    MAX_PLAN_HISTORY = 200
+    
+    # Saves within this many seconds share one last_modified timestamp
+    TIMESTAMP_COALESCE_SECONDS = 0.05
+    
     def __init__(self, filepath: Path):
         """
         Initialize workspace manager.
@@ -29,6 +361,51 @@ class WorkspaceManager:
         self.filepath = filepath
         # Reco workspace is same directory, base name + _reco suffix
         self.reco_filepath = filepath.parent / f"{filepath.stem}_reco.json"
+        self._last_ts_mono = None
+        self._last_ts_str = ""
+        # Content digest of the last successful save (see save()) and
+        # reco save (see save_reco())
+        self._saved_digest = None
+        self._saved_reco_digest = None
+        # (file key, non-meal sections) as of the last load/save, for
+        # convert_from_planning_workspace; the key is checked like
+        # _disk_cache's so an edit outside the app is re-read
+        self._cached_sections = None
+        # ((st_mtime_ns, st_size), payload) of the last file we wrote,
+        # letting load() skip the read while the file is unchanged
+        self._disk_cache = None
+        # Same for the reco file (see load_reco()), plus the candidate
+        # counts of that save
+        self._reco_disk_cache = None
+        self._reco_counts = None
+        # Reco workspace shared by load_reco()/save_reco() inside
+        # transaction(), and whether it needs writing on exit
+        self._reco_txn = None
+        self._reco_txn_depth = 0
+        self._reco_txn_dirty = False
+    
+    def _now_iso(self) -> str:
+        """
+        Current time as an ISO string, reused for bursts of saves.
+        
+        Returns:
+            ISO timestamp, at most TIMESTAMP_COALESCE_SECONDS stale
+        """
+        now = time.monotonic()
+        if (self._last_ts_mono is None
+                or now - self._last_ts_mono > self.TIMESTAMP_COALESCE_SECONDS):
+            self._last_ts_str = datetime.now().isoformat()
+            self._last_ts_mono = now
+        return self._last_ts_str
+    
+    def _now_short(self) -> str:
+        """
+        Current time as 'YYYY-MM-DD HH:MM', from the _now_iso() cache.
+        
+        Returns:
+            Minute-resolution timestamp used in plan history entries
+        """
+        return self._now_iso()[:16].replace('T', ' ')
     
     def load(self) -> Dict[str, Any]:
         """
@@ -37,71 +414,90 @@ class WorkspaceManager:
         Returns:
             Workspace dictionary, or empty workspace if file doesn't exist
         """
-        if not self.filepath.exists():
-            return self._create_empty_workspace()
+        data = self._read_cached()
+        if data is not None:
+            key = self._disk_cache[0]
+        else:
+            # Taken before the read: a change in between only makes
+            # the cached sections look stale, never current
+            key = _file_key(self.filepath)
+            data = self._read_workspace()
+        self._remember_sections(data, key)
+        return data
+    
+    def _read_cached(self) -> Optional[Dict[str, Any]]:
+        """
+        Parse the last saved payload if the file on disk is still that save.
+        
+        Skips reading the file; the result is a fresh dict, as with a
+        normal load.
+        
+        Returns:
+            Workspace dictionary, or None if the file must be read
+        """
+        payload = self._saved_payload()
+        if payload is None:
+            return None
         
+        data = _loads(payload)
+        _fill_defaults(data, _DEFAULT_SCHEMA)
+        _rehydrate_meals(data["meals"])
+        return data
+    
+    def _saved_payload(self) -> Optional[bytes]:
+        """
+        Return the last saved payload if the file is still that save.
+        
+        Returns:
+            Payload bytes, or None if the file changed, is gone, or was
+            never saved by this manager
+        """
+        if self._disk_cache is None:
+            return None
+        
+        key, payload = self._disk_cache
+        current = _file_key(self.filepath)
+        if current is None:
+            return None
+        
+        if current != key:
+            # Changed outside this manager
+            self._disk_cache = None
+            return None
+        
+        return payload
+    
+    def _read_workspace(self) -> Dict[str, Any]:
+        """Read, validate and migrate the workspace file (see load())."""
+        # Only the read/parse is guarded - a bug below must not be
+        # mistaken for a corrupted file and trigger an overwrite.
+        # Opening directly (no exists() check) saves a stat per load.
         try:
-            with open(self.filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Validate structure
-            if not isinstance(data, dict):
-                return self._create_empty_workspace()
-            
-            # Ensure required fields
-            if "last_modified" not in data:
-                data["last_modified"] = datetime.now().isoformat()
-            
-            if "meals" not in data or not isinstance(data["meals"], dict):
-                data["meals"] = {}
-
-            # Initialize command_history if missing (backward compatibility)
-            if "command_history" not in data:
-                data["command_history"] = {
-                    "threshold": {},
-                    "analyze": {},
-                    "recommend": {}
-                }
-            else:
-                # Ensure all three command types exist
-                for cmd in ["threshold", "analyze", "recommend"]:
-                    if cmd not in data["command_history"]:
-                        data["command_history"][cmd] = {}
-        
-            # Initialize inventory if missing
-            if "inventory" not in data:
-                data["inventory"] = {
-                    "leftovers": {},
-                    "batch": {},
-                    "rotating": {}
-                }
-            else:
-                # Ensure all three inventory types exist
-                for inv_type in ["leftovers", "batch", "rotating"]:
-                    if inv_type not in data["inventory"]:
-                        data["inventory"][inv_type] = {}
-
-            if "locks" not in data:
-                data["locks"] = {
-                    "include": {},
-                    "exclude": []
-                }
-            else:
-                # Ensure both lock types exist
-                if "include" not in data["locks"]:
-                    data["locks"]["include"] = {}
-                if "exclude" not in data["locks"]:
-                    data["locks"]["exclude"] = []
-
-            # MIGRATION: If old reco data exists in main workspace, migrate it
-            if "generated_candidates" in data or "generation_state" in data:
-                self._migrate_reco_data(data)
-
-            return data
-            
-        except (json.JSONDecodeError, Exception):
+            data = _load_file(self.filepath)
+        except FileNotFoundError:
+            return self._create_empty_workspace()
+        except _READ_ERRORS:
             # Corrupted file - return empty workspace
             return self._create_empty_workspace()
+        
+        # Validate structure
+        if not isinstance(data, dict):
+            return self._create_empty_workspace()
+        
+        # Ensure required fields
+        if "last_modified" not in data:
+            data["last_modified"] = self._now_iso()
+        
+        # Fill in missing sections (backward compatibility)
+        _fill_defaults(data, _DEFAULT_SCHEMA)
+
+        _rehydrate_meals(data["meals"])
+
+        # MIGRATION: If old reco data exists in main workspace, migrate it
+        if "generated_candidates" in data or "generation_state" in data:
+            self._migrate_reco_data(data)
+
+        return data
     
     def save(self, workspace: Dict[str, Any]) -> None:
         """
@@ -115,17 +511,66 @@ class WorkspaceManager:
         """
         # Safety: Remove reco data if present (shouldn't be, but be defensive)
         workspace_clean = {k: v for k, v in workspace.items() 
-                          if k not in ("generated_candidates", "generation_state")}
+                          if k not in ("generated_candidates", "generation_state",
+                                       "last_modified")}
+        
+        # Default-valued meal fields are restored on load
+        meals = workspace_clean.get("meals")
+        if isinstance(meals, dict):
+            workspace_clean["meals"] = {
+                meal_id: _strip_meal_defaults(meal) if isinstance(meal, dict) else meal
+                for meal_id, meal in meals.items()
+            }
+        
+        # Update timestamp - written last so the content can be hashed apart from it
+        workspace_clean["last_modified"] = self._now_iso()
+        
+        try:
+            payload = _dumps(workspace_clean)
+            digest = _content_digest(payload)
+        except (TypeError, ValueError) as e:
+            # Log error but don't crash - workspace is session-only
+            print(f"Warning: Failed to save workspace: {e}")
+            return
         
-        # Update timestamp
-        workspace_clean["last_modified"] = datetime.now().isoformat()
+        # Nothing changed since the last save, and the file on disk is
+        # still that save (not deleted or edited outside the app)
+        if digest == self._saved_digest and self._saved_payload() is not None:
+            self._remember_sections(workspace_clean, self._disk_cache[0])
+            return
         
         try:
-            with open(self.filepath, 'w', encoding='utf-8') as f:
-                json.dump(workspace_clean, f, indent=2, ensure_ascii=False)
-        except Exception as e:
+            _write_atomic(self.filepath, payload)
+            st = os.stat(self.filepath)
+        except OSError as e:
             # Log error but don't crash - workspace is session-only
             print(f"Warning: Failed to save workspace: {e}")
+            self._saved_digest = None
+            self._disk_cache = None
+            self._cached_sections = None
+            return
+        
+        key = (st.st_mtime_ns, st.st_size)
+        self._saved_digest = digest
+        self._disk_cache = (key, payload)
+        self._remember_sections(workspace_clean, key)
+    
+    def _remember_sections(
+            self,
+            workspace: Dict[str, Any],
+            key: Optional[Tuple[int, int]]
+        ) -> None:
+        """
+        Keep a private copy of everything but the meals.
+        
+        Args:
+            workspace: Workspace just loaded or saved
+            key: _file_key() of the file holding that workspace
+        """
+        sections = copy.deepcopy(
+            {k: v for k, v in workspace.items() if k != "meals"}
+        )
+        self._cached_sections = (key, sections)
     
     def load_reco(self) -> Dict[str, Any]:
         """
@@ -134,95 +579,201 @@ class WorkspaceManager:
         Returns:
             Reco workspace dictionary, or empty reco workspace if file doesn't exist
         """
-        if not self.reco_filepath.exists():
-            return self._create_empty_reco_workspace()
+        if self._reco_txn is not None:
+            return self._reco_txn
         
-        try:
-            with open(self.reco_filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Validate structure
-            if not isinstance(data, dict):
-                return self._create_empty_reco_workspace()
-            
-            # Ensure required fields
-            if "last_modified" not in data:
-                data["last_modified"] = datetime.now().isoformat()
-            
-            # Ensure generated_candidates structure
-            if "generated_candidates" not in data:
-                data["generated_candidates"] = {}
-            
-            # Ensure generation_state structure  
-            if "generation_state" not in data:
-                data["generation_state"] = {}
-            
+        data = self._read_reco_cached()
+        if data is not None:
             return data
-            
-        except (json.JSONDecodeError, Exception):
-            # Corrupted file - return empty reco workspace
+        
+        try:
+            data = _load_file(self.reco_filepath)
+        except _READ_ERRORS:
+            # Missing or corrupted file - return empty reco workspace
+            return self._create_empty_reco_workspace()
+        
+        # Validate structure
+        if not isinstance(data, dict):
             return self._create_empty_reco_workspace()
+        
+        # Ensure required fields
+        if "last_modified" not in data:
+            data["last_modified"] = self._now_iso()
+        
+        # Ensure generated_candidates / generation_state structure
+        _fill_defaults(data, _RECO_SCHEMA)
+        
+        return data
+    
+    def _read_reco_cached(self) -> Optional[Dict[str, Any]]:
+        """
+        Parse the last saved reco payload if the file is still that save.
+        
+        Reco helpers each call load_reco(), so this saves a file read
+        per call; the result is a fresh dict, as with a normal load.
+        
+        Returns:
+            Reco workspace dictionary, or None if the file must be read
+        """
+        payload = self._reco_saved_payload()
+        if payload is None:
+            return None
+        
+        data = _loads(payload)
+        _fill_defaults(data, _RECO_SCHEMA)
+        return data
+    
+    def _reco_saved_payload(self) -> Optional[bytes]:
+        """
+        Return the last saved reco payload if the file is still that save.
+        
+        Returns:
+            Payload bytes, or None if the file changed or was never saved
+        """
+        if self._reco_disk_cache is None:
+            return None
+        
+        key, payload = self._reco_disk_cache
+        try:
+            st = os.stat(self.reco_filepath)
+        except OSError:
+            return None
+        
+        if (st.st_mtime_ns, st.st_size) != key:
+            # Changed outside this manager
+            self._reco_disk_cache = None
+            self._reco_counts = None
+            return None
+        
+        return payload
     
     def save_reco(self, reco_workspace: Dict[str, Any]) -> None:
         """
         Save reco workspace to disk.
         
+        Inside transaction() the write is deferred until the outermost
+        transaction exits.
+        
         Args:
             reco_workspace: Reco workspace dictionary
         """
-        # Update timestamp
-        reco_workspace["last_modified"] = datetime.now().isoformat()
+        if self._reco_txn is not None:
+            self._reco_txn = reco_workspace
+            self._reco_txn_dirty = True
+            return
+        
+        self._write_reco(reco_workspace)
+    
+    def _write_reco(self, reco_workspace: Dict[str, Any]) -> bool:
+        """
+        Serialize and write the reco workspace now (see save_reco()).
+        
+        Args:
+            reco_workspace: Reco workspace dictionary (not modified)
+        
+        Returns:
+            True if the file holds this content, False if the write failed
+        """
+        # Shallow copy with a new timestamp, written last so the content
+        # can be hashed apart from it
+        reco_clean = {k: v for k, v in reco_workspace.items() if k != "last_modified"}
+        reco_clean["last_modified"] = self._now_iso()
         
         try:
-            with open(self.reco_filepath, 'w', encoding='utf-8') as f:
-                json.dump(reco_workspace, f, indent=2, ensure_ascii=False)
-        except Exception as e:
+            payload = _dumps_pretty(reco_clean)
+            digest = _content_digest(payload)
+            
+            # Same candidates/state as the last save, and the file on
+            # disk is still that save - nothing to write
+            if digest == self._saved_reco_digest and self._reco_saved_payload() is not None:
+                return True
+            
+            _write_atomic(self.reco_filepath, payload)
+            self._saved_reco_digest = digest
+            st = os.stat(self.reco_filepath)
+            self._reco_disk_cache = ((st.st_mtime_ns, st.st_size), payload)
+            self._reco_counts = _count_candidates(reco_workspace.get("generated_candidates"))
+            return True
+        except (OSError, TypeError, ValueError) as e:
             print(f"Warning: Failed to save reco workspace: {e}")
+            self._reco_disk_cache = None
+            self._reco_counts = None
+            return False
+    
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Batch reco workspace updates into a single read and write.
+        
+        Within the block, load_reco() returns one shared dict and
+        save_reco() only marks it dirty, so a sequence like
+        set_generated_candidates() followed by other reco helpers costs
+        one load and at most one save. Transactions nest; the write
+        happens when the outermost block exits normally. If the block
+        raises, the pending changes are discarded.
+        
+        Example:
+            with workspace_mgr.transaction():
+                workspace_mgr.clear_generated_candidates()
+                workspace_mgr.set_generated_candidates("lunch", raw)
+        """
+        if self._reco_txn_depth == 0:
+            self._reco_txn = self.load_reco()
+            self._reco_txn_dirty = False
+        self._reco_txn_depth += 1
+        
+        committed = False
+        try:
+            yield
+            committed = True
+        finally:
+            self._reco_txn_depth -= 1
+            if self._reco_txn_depth == 0:
+                reco_workspace = self._reco_txn
+                dirty = self._reco_txn_dirty
+                self._reco_txn = None
+                self._reco_txn_dirty = False
+                if committed and dirty:
+                    self.save_reco(reco_workspace)
     
     def clear(self) -> None:
         """Delete the workspace file."""
-        if self.filepath.exists():
-            try:
-                self.filepath.unlink()
-            except Exception as e:
-                print(f"Warning: Failed to delete workspace: {e}")
+        try:
+            self.filepath.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Warning: Failed to delete workspace: {e}")
+        self._saved_digest = None
+        self._cached_sections = None
+        self._disk_cache = None
     
     def clear_reco(self) -> None:
         """Delete the reco workspace file."""
-        if self.reco_filepath.exists():
-            try:
-                self.reco_filepath.unlink()
-            except Exception as e:
-                print(f"Warning: Failed to delete reco workspace: {e}")
+        self._saved_reco_digest = None
+        self._reco_disk_cache = None
+        self._reco_counts = None
+        if self._reco_txn is not None:
+            self._reco_txn = self._create_empty_reco_workspace()
+            self._reco_txn_dirty = False
+        try:
+            self.reco_filepath.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Warning: Failed to delete reco workspace: {e}")
     
     def _create_empty_workspace(self) -> Dict[str, Any]:
         """Create empty workspace structure (WITHOUT reco data)."""
-        return {
-            "last_modified": datetime.now().isoformat(),
-            "meals": {},
-            "command_history": {
-                "threshold": {},
-                "analyze": {},
-                "recommend": {}
-            },
-            "inventory": {
-                "leftovers": {},
-                "batch": {},
-                "rotating": {}
-            },
-            "locks": {
-                "include": {},
-                "exclude": []
-            }
-        }
+        workspace = {"last_modified": self._now_iso()}
+        workspace.update(_loads(_EMPTY_WORKSPACE_JSON))
+        return workspace
     
     def _create_empty_reco_workspace(self) -> Dict[str, Any]:
         """Create empty reco workspace structure."""
-        return {
-            "last_modified": datetime.now().isoformat(),
-            "generated_candidates": {},
-            "generation_state": {}
-        }
+        reco_workspace = {"last_modified": self._now_iso()}
+        reco_workspace.update(_loads(_EMPTY_RECO_JSON))
+        return reco_workspace
     
     def _migrate_reco_data(self, workspace: Dict[str, Any]) -> None:
         """
@@ -244,29 +795,50 @@ class WorkspaceManager:
         if "generation_state" in workspace:
             reco_workspace["generation_state"] = workspace.pop("generation_state")
         
-        # Save both files
-        self.save(workspace)  # Save cleaned main workspace
-        self.save_reco(reco_workspace)  # Save new reco workspace
+        # Write the reco file first and only then the cleaned main
+        # workspace, so a failed reco write leaves the main file (and the
+        # legacy reco data in it) untouched
+        if not self._write_reco(reco_workspace):
+            print("[MIGRATION] Failed - main workspace left unchanged")
+            print()
+            return
+        self.save(workspace)
         
         print(f"[MIGRATION] Reco data moved to: {self.reco_filepath}")
         print()
     
-    # ... (rest of the methods remain unchanged)
-    
-    def convert_from_planning_workspace(self, planning_ws: Dict[str, Any]) -> Dict[str, Any]:
+    def convert_from_planning_workspace(
+            self,
+            planning_ws: Dict[str, Any],
+            existing_workspace: Optional[Dict[str, Any]] = None
+        ) -> Dict[str, Any]:
         """
         Convert old planning_workspace format to new workspace format.
         
         Args:
             planning_ws: Old format workspace from context
+            existing_workspace: Workspace the caller already holds; its
+                non-meal sections are carried over (shared, not copied)
         
         Returns:
             New format workspace
         """
-        # Load existing workspace to preserve command_history and inventory
-        workspace = self.load()
+        if existing_workspace is not None:
+            workspace = {k: v for k, v in existing_workspace.items() if k != "meals"}
+        else:
+            # Preserve command_history, inventory and locks from the last
+            # load/save while the file is still that version; otherwise
+            # re-read it, so edits made outside the app are kept
+            cached = self._cached_sections
+            if cached is not None and cached[0] == _file_key(self.filepath):
+                workspace = copy.deepcopy(cached[1])
+            else:
+                # load() returns a fresh dict - no second copy needed
+                workspace = {
+                    k: v for k, v in self.load().items() if k != "meals"
+                }
         
-        # Clear meals but keep command_history and inventory
+        # Meals come entirely from the planning workspace
         workspace["meals"] = {}
         
         # Convert candidates list to meals dict
@@ -276,23 +848,7 @@ class WorkspaceManager:
                 continue
             
             # Map candidate to meal structure
-            workspace["meals"][meal_id] = {
-                "description": candidate.get("description"),
-                "analyzed_as": candidate.get("analyzed_as"),
-                "created": candidate.get("created"),
-                "meal_name": candidate.get("meal_name"),
-                "type": candidate.get("type"),
-                "items": candidate.get("items", []),
-                "totals": candidate.get("totals", {}),
-                "source_date": candidate.get("source_date"),
-                "source_time": candidate.get("source_time"),
-                "parent_id": candidate.get("parent_id"),
-                "ancestor_id": candidate.get("ancestor_id"),
-                "modification_log": candidate.get("modification_log", []),
-                "meets_constraints": candidate.get("meets_constraints", True),
-                "history": candidate.get("history", []),
-                "immutable": candidate.get("immutable", False)
-            }
+            workspace["meals"][meal_id] = _project_meal(candidate)
         
         return workspace
     
@@ -306,62 +862,34 @@ class WorkspaceManager:
         Returns:
             Planning workspace format for context
         """
-        planning_ws = {
-            "candidates": [],
-            "next_numeric_id": 1,
-            "next_invented_id": 1
-        }
+        candidates = []
+        max_numeric = 0
+        max_invented = 0
+        match_id = _MEAL_ID_RE.match
         
-        # Convert meals dict to candidates list
+        # Convert meals dict to candidates list, tracking the highest
+        # numeric and invented IDs in the same pass
         for meal_id, meal_data in workspace.get("meals", {}).items():
-            candidate = {
-                "id": meal_id,
-                "description": meal_data.get("description"),
-                "analyzed_as": meal_data.get("analyzed_as"),
-                "created": meal_data.get("created"),
-                "meal_name": meal_data.get("meal_name"),
-                "type": meal_data.get("type"),
-                "items": meal_data.get("items", []),
-                "totals": meal_data.get("totals", {}),
-                "source_date": meal_data.get("source_date"),
-                "source_time": meal_data.get("source_time"),
-                "parent_id": meal_data.get("parent_id"),
-                "ancestor_id": meal_data.get("ancestor_id"),
-                "modification_log": meal_data.get("modification_log", []),
-                "meets_constraints": meal_data.get("meets_constraints", True),
-                "history": meal_data.get("history", []),
-                "immutable": meal_data.get("immutable", False)
-            }
-            planning_ws["candidates"].append(candidate)
-        
-        # Calculate next IDs
-        numeric_ids = []
-        invented_ids = []
-        
-        for meal_id in workspace.get("meals", {}).keys():
-            if meal_id.startswith("N"):
-                # Extract number from N1, N2, etc.
-                try:
-                    base = meal_id.lstrip("N").rstrip("abcdefghijklmnopqrstuvwxyz")
-                    if base:
-                        invented_ids.append(int(base))
-                except ValueError:
-                    pass
-            else:
-                # Extract number from 1, 2, 123a, etc.
-                try:
-                    base = meal_id.rstrip("abcdefghijklmnopqrstuvwxyz")
-                    if base:
-                        numeric_ids.append(int(base))
-                except ValueError:
-                    pass
-        
-        if numeric_ids:
-            planning_ws["next_numeric_id"] = max(numeric_ids) + 1
-        if invented_ids:
-            planning_ws["next_invented_id"] = max(invented_ids) + 1
+            candidate = {"id": meal_id}
+            candidate.update(_project_meal(meal_data))
+            candidates.append(candidate)
+            
+            match = match_id(meal_id)
+            if not match:
+                continue
+            
+            number = int(match.group(2))
+            if match.group(1):
+                if number > max_invented:
+                    max_invented = number
+            elif number > max_numeric:
+                max_numeric = number
         
-        return planning_ws
+        return {
+            "candidates": candidates,
+            "next_numeric_id": max_numeric + 1,
+            "next_invented_id": max_invented + 1
+        }
     
     # Method to record command in history
     def record_command_history(self, workspace: Dict[str, Any], 
@@ -387,21 +915,13 @@ class WorkspaceManager:
         if command not in workspace["command_history"]:
             workspace["command_history"][command] = {}
         
+        # Put params at the front; dict.fromkeys keeps the first
+        # occurrence, so an older duplicate drops out in the same pass
         meal_history = workspace["command_history"][command].get(meal, [])
+        recent = dict.fromkeys([params, *meal_history])
         
-        # Remove duplicate if exists (move to front)
-        if params in meal_history:
-            meal_history.remove(params)
-        
-        # Add to front
-        meal_history.insert(0, params)
-        
-        # Trim to max size
-        if len(meal_history) > max_size:
-            meal_history = meal_history[:max_size]
-        
-        # Save back
-        workspace["command_history"][command][meal] = meal_history
+        # Save back as a plain list (stays JSON-serializable)
+        workspace["command_history"][command][meal] = list(islice(recent, max_size))
 
     # Method to get command history
     def get_command_history(self, workspace: Dict[str, Any],
@@ -417,7 +937,8 @@ class WorkspaceManager:
             limit: Optional limit on number of entries to return
         
         Returns:
-            List of parameter strings, most recent first
+            List of parameter strings, most recent first. Without a
+            limit this is the stored list itself - treat it as read-only.
         """
         if "command_history" not in workspace:
             return []
@@ -427,33 +948,36 @@ class WorkspaceManager:
         
         meal_history = workspace["command_history"][command].get(meal, [])
         
+        # Only slice when the limit actually cuts the list
         if limit and limit < len(meal_history):
             return meal_history[:limit]
         
-        return meal_history.copy()
+        return meal_history
 
     def append_plan_history(self, workspace: Dict[str, Any], plan_id: str, 
                         command: str, note: str) -> None:
         """
         Append a history entry to a plan's history.
         
+        The history is capped at MAX_PLAN_HISTORY entries; the oldest
+        are dropped.
+        
         Args:
             workspace: Workspace dictionary (new format)
             plan_id: Plan ID
             command: Command string
             note: Description of what happened
         """
-        if "meals" not in workspace or plan_id not in workspace["meals"]:
+        meal = workspace.get("meals", {}).get(plan_id)
+        if meal is None:
             return
         
-        meal = workspace["meals"][plan_id]
-        
-        if "history" not in meal:
-            meal["history"] = []
+        history = meal.setdefault("history", [])
+        if len(history) >= self.MAX_PLAN_HISTORY:
+            del history[:len(history) - self.MAX_PLAN_HISTORY + 1]
         
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
-        meal["history"].append({
-            'timestamp': timestamp,
+        history.append({
+            'timestamp': self._now_short(),
             'command': command,
             'note': note
         })
@@ -467,7 +991,7 @@ class WorkspaceManager:
             plan_id: Plan ID
         
         Returns:
-            List of history entries
+            List of history entries (the stored list - treat as read-only)
         """
         if "meals" not in workspace or plan_id not in workspace["meals"]:
             return []
@@ -492,6 +1016,47 @@ class WorkspaceManager:
         gen_cands = reco_workspace.get("generated_candidates")
         return gen_cands if gen_cands else None
 
+    def get_generated_candidate(
+            self,
+            candidate_id: str,
+            gen_cands: Optional[Dict[str, Any]] = None
+        ) -> Optional[Dict[str, Any]]:
+        """
+        Look up a generated candidate by G-ID (case-insensitive).
+        
+        IDs are assigned sequentially, so "Gk" normally sits at index
+        k-1 and is found without scanning; a reordered or trimmed list
+        falls back to a linear search.
+        
+        Args:
+            candidate_id: Candidate ID, e.g. "G3"
+            gen_cands: Generated candidates section if already loaded
+                (avoids another reco load)
+        
+        Returns:
+            Candidate dict, or None if not found
+        """
+        if gen_cands is None:
+            gen_cands = self.get_generated_candidates()
+        if not gen_cands:
+            return None
+        
+        candidates = gen_cands.get("candidates", [])
+        wanted = candidate_id.upper()
+        
+        match = _G_ID_RE.match(wanted)
+        if match:
+            index = int(match.group(1)) - 1
+            if 0 <= index < len(candidates):
+                candidate = candidates[index]
+                if candidate.get("id", "").upper() == wanted:
+                    return candidate
+        
+        for candidate in candidates:
+            if candidate.get("id", "").upper() == wanted:
+                return candidate
+        return None
+
     def set_generated_candidates(
             self,
             meal_type: str,
@@ -516,38 +1081,26 @@ class WorkspaceManager:
         if append and "generated_candidates" in reco_workspace:
             existing_candidates = reco_workspace["generated_candidates"].get("candidates", [])
         
-        # Transform to unified structure
-        unified_candidates = []
-        for i, raw_cand in enumerate(raw_candidates, 1):
-            # Extract meal data
-            meal_data = {
-                "items": raw_cand.get("items", []),
-                "totals": raw_cand.get("totals", {}),
-                "meal_type": raw_cand.get("meal_type", meal_type),
-                "source_date": raw_cand.get("source_date"),
-                "description": raw_cand.get("description", "")
-            }
-            
-            # Extract generation metadata
-            gen_metadata = {
-                "method": raw_cand.get("generation_method", "unknown"),
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            # Add template info if present
-            if "template_info" in raw_cand:
-                gen_metadata["template_info"] = raw_cand["template_info"]
-            
-            # Create unified candidate with cursor-based ID
-            unified = {
-                "id": f"G{cursor + i}",  # Use cursor for ID offset
-                "meal": meal_data,
-                "generation_metadata": gen_metadata,
+        # One timestamp for the whole batch
+        timestamp = self._now_iso()
+        
+        # Transform to unified structure, IDs offset by cursor
+        unified_candidates = [
+            {
+                "id": f"G{cursor + i}",
+                "meal": {
+                    "items": raw_cand.get("items", []),
+                    "totals": raw_cand.get("totals", {}),
+                    "meal_type": raw_cand.get("meal_type", meal_type),
+                    "source_date": raw_cand.get("source_date"),
+                    "description": raw_cand.get("description", "")
+                },
+                "generation_metadata": _generation_metadata(raw_cand, timestamp),
                 "filter_result": None,  # Until filtered
                 "score_result": None    # Until scored
             }
-            
-            unified_candidates.append(unified)
+            for i, raw_cand in enumerate(raw_candidates, 1)
+        ]
         
         # Combine with existing if appending
         all_candidates = existing_candidates + unified_candidates if append else unified_candidates
@@ -577,30 +1130,34 @@ class WorkspaceManager:
         Returns:
             True if generated candidates exist
         """
-        reco_workspace = self.load_reco()
-        return "generated_candidates" in reco_workspace
+        # load_reco() always fills in an empty section, so test the
+        # contents rather than the key
+        return self.get_generated_candidates() is not None
+
+    def get_candidate_counts(self) -> Dict[str, int]:
+        """
+        Get raw, filtered and scored candidate counts from one reco load.
+        
+        Counts are kept from the last save_reco(), so while the reco file
+        is unchanged this costs a stat rather than a parse.
+        
+        Returns:
+            Dict with "raw", "filtered" and "scored" counts
+        """
+        if (self._reco_txn is None and self._reco_counts is not None
+                and self._reco_saved_payload() is not None):
+            return dict(self._reco_counts)
+        
+        return _count_candidates(self.get_generated_candidates())
 
     def get_raw_candidates_count(self) -> int:
         """Get count of all candidates."""
-        gen_cands = self.get_generated_candidates()
-        if not gen_cands:
-            return 0
-        return len(gen_cands.get("candidates", []))
+        return self.get_candidate_counts()["raw"]
 
     def get_filtered_candidates_count(self) -> int:
         """Get count of filtered (passed) candidates."""
-        gen_cands = self.get_generated_candidates()
-        if not gen_cands:
-            return 0
-        candidates = gen_cands.get("candidates", [])
-        return sum(1 for c in candidates 
-                if c.get("filter_result", {}).get("passed", False))
+        return self.get_candidate_counts()["filtered"]
 
     def get_scored_candidates_count(self) -> int:
         """Get count of scored candidates."""
-        gen_cands = self.get_generated_candidates()
-        if not gen_cands:
-            return 0
-        candidates = gen_cands.get("candidates", [])
-        return sum(1 for c in candidates if c.get("score_result") is not None)
-    
+        return self.get_candidate_counts()["scored"]
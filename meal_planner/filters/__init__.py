@@ -2,7 +2,7 @@
 """
 Filtering modules for meal recommendation pipeline.
 """
-from .base_filter import BaseFilter
+from .base_filter import BaseFilter, CodeInterner, CODE_SET_KEY, EMPTY_REASONS
 from .pre_score_filter import PreScoreFilter
 from .leftover_match_filter import LeftoverMatchFilter
 from .nutrient_constraint_filter import NutrientConstraintFilter
@@ -11,6 +11,9 @@ from .conditional_requirement_filter import ConditionalRequirementFilter
 
 __all__ = [
     'BaseFilter',
+    'CodeInterner',
+    'CODE_SET_KEY',
+    'EMPTY_REASONS',
     'PreScoreFilter', 
     'LeftoverMatchFilter', 
     'NutrientConstraintFilter',
@@ -5,16 +5,80 @@ Base class for meal candidate filters.
 Defines the standard interface and common behaviors for all filters
 in the recommendation pipeline.
 """
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterable, FrozenSet
 from abc import ABC, abstractmethod
 
 
+# Candidate key caching the lowercased food codes (see
+# BaseFilter.candidate_codes); callers pop it before saving candidates
+CODE_SET_KEY = "_code_set"
+
+# Shared placeholder for a candidate with no rejection reasons yet. Most
+# candidates pass, so the real list is only allocated on the first
+# violation (see BaseFilter.add_rejection_reasons).
+EMPTY_REASONS = ()
+
+
+class CodeInterner:
+    """
+    Assigns each food code a bit so that code sets become int bitmasks.
+    
+    Rule filters intern the codes their rules mention; a candidate's
+    codes then map to a mask, "any overlap" is a single &, and the size
+    of an overlap is its bit_count().
+    """
+    
+    def __init__(self):
+        """Initialize with no codes."""
+        self._bits: Dict[str, int] = {}
+    
+    def add(self, codes: Iterable[str]) -> int:
+        """
+        Get the mask for a set of codes, assigning bits to new codes.
+        
+        Args:
+            codes: Food codes (already lowercased)
+        
+        Returns:
+            Bitmask with one bit per code
+        """
+        bits = self._bits
+        mask = 0
+        for code in codes:
+            bit = bits.get(code)
+            if bit is None:
+                bit = bits[code] = 1 << len(bits)
+            mask |= bit
+        return mask
+    
+    def mask(self, codes: Iterable[str]) -> int:
+        """
+        Get the mask for a candidate's codes.
+        
+        Codes that were never added (no rule mentions them) can't affect
+        any rule, so they are left out.
+        
+        Args:
+            codes: Food codes (already lowercased)
+        
+        Returns:
+            Bitmask of the known codes
+        """
+        get_bit = self._bits.get
+        mask = 0
+        for code in codes:
+            mask |= get_bit(code, 0)
+        return mask
+
+
 class BaseFilter(ABC):
     """
     Abstract base class for meal candidate filters.
     
     All filters follow a common contract:
-    - Accept a list of candidates with 'rejection_reasons' field initialized
+    - Accept a list of candidates with 'rejection_reasons' initialized
+      (to EMPTY_REASONS or a list)
+    - Record violations with add_rejection_reasons()
     - Return (passed, rejected) tuple based on filter criteria
     - Support collect_all mode for accumulating violations across filters
     
@@ -22,9 +86,16 @@ class BaseFilter(ABC):
     - filter_candidates(): Core filtering logic
     """
     
-    def __init__(self):
-        """Initialize base filter."""
+    def __init__(self, thresholds_mgr=None):
+        """
+        Initialize base filter.
+        
+        Args:
+            thresholds_mgr: ThresholdsManager, needed to resolve pool
+                references (see resolve_codes)
+        """
         self.collect_all = False
+        self.thresholds_mgr = thresholds_mgr
     
     @abstractmethod
     def filter_candidates(
@@ -37,8 +108,8 @@ class BaseFilter(ABC):
         Subclasses implement specific filtering criteria.
         
         Expected behavior:
-        - Candidates have 'rejection_reasons' list initialized
-        - Add reasons to rejection_reasons for violations
+        - Candidates have 'rejection_reasons' initialized
+        - Add reasons with add_rejection_reasons() for violations
         - If collect_all=True: accumulate reasons but still pass candidates
         - If collect_all=False: reject candidates immediately on violation
         
@@ -50,6 +121,85 @@ class BaseFilter(ABC):
         """
         pass
     
+    def resolve_codes(self, spec: Any) -> FrozenSet[str]:
+        """
+        Resolve a rule's code specification to a set of food codes.
+        
+        Args:
+            spec: Can be:
+                - String (single code): "ot.1a"
+                - String (pool ref): "pool:breakfast_meats"
+                - List of strings: ["ot.1a", "pool:fruits"]
+        
+        Returns:
+            Frozen set of food codes, lowercased to match candidate codes;
+            a lone pool reference returns the manager's shared set
+        """
+        if isinstance(spec, str):
+            items = [spec]
+        elif isinstance(spec, list):
+            items = spec
+        else:
+            return frozenset()
+        
+        # A lone pool reference keeps the shared pool set
+        if len(items) == 1 and isinstance(items[0], str) and items[0].startswith("pool:"):
+            return self.thresholds_mgr.expand_pool_codes(items[0][5:])
+        
+        codes = set()
+        for item in items:
+            if not isinstance(item, str):
+                continue
+            if item.startswith("pool:"):
+                codes.update(self.thresholds_mgr.expand_pool_codes(item[5:]))
+            else:
+                codes.add(item.lower())
+        return frozenset(codes)
+    
+    @staticmethod
+    def candidate_codes(candidate: Dict[str, Any]) -> FrozenSet[str]:
+        """
+        Get the lowercased food codes in a candidate's meal.
+        
+        Computed on first use and cached on the candidate under
+        CODE_SET_KEY, so later filters in the pipeline don't re-walk
+        the items. Items aren't modified while filtering.
+        
+        Args:
+            candidate: Candidate dict with meal.items
+        
+        Returns:
+            Frozen set of lowercase food codes
+        """
+        codes = candidate.get(CODE_SET_KEY)
+        if codes is None:
+            codes = frozenset(
+                item["code"].lower()
+                for item in candidate.get("meal", {}).get("items", [])
+                if item.get("code")
+            )
+            candidate[CODE_SET_KEY] = codes
+        return codes
+    
+    @staticmethod
+    def add_rejection_reasons(candidate: Dict[str, Any], reasons: Iterable[str]) -> None:
+        """
+        Append rejection reasons to a candidate.
+        
+        Replaces the shared EMPTY_REASONS placeholder (or a missing
+        field) with a fresh list before appending, so the placeholder is
+        never modified.
+        
+        Args:
+            candidate: Candidate dict (modified in place)
+            reasons: Reasons to append
+        """
+        current = candidate.get("rejection_reasons", EMPTY_REASONS)
+        if not isinstance(current, list):
+            current = list(current)
+            candidate["rejection_reasons"] = current
+        current.extend(reasons)
+    
     def get_filter_stats(
         self,
         original_count: int,
@@ -68,7 +218,6 @@ class BaseFilter(ABC):
         Returns:
             Formatted statistics string
         """
-        rejected_count = original_count - filtered_count
         pass_rate = (filtered_count / original_count * 100) if original_count > 0 else 0
         
         return f"passed {filtered_count}/{original_count} ({pass_rate:.1f}%)"
\ No newline at end of file
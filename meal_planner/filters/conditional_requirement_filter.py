@@ -5,8 +5,8 @@ Conditional requirement filter for meal candidates.
 Enforces conditional rules where presence of certain items requires
 other items to be present with min/max constraints.
 """
-from typing import List, Dict, Any, Set, Tuple, Optional
-from .base_filter import BaseFilter
+from typing import List, Dict, Any, Tuple, Optional
+from .base_filter import BaseFilter, CodeInterner
 
 
 class ConditionalRequirementFilter(BaseFilter):
@@ -43,12 +43,19 @@ class ConditionalRequirementFilter(BaseFilter):
                 - if_present: Trigger codes/list/pool
                 - then_require: Dict with 'from', 'min', 'max'
         """
-        super().__init__()
+        super().__init__(thresholds_mgr)
         
         self.meal_type = meal_type
-        self.thresholds_mgr = thresholds_mgr
         self.requirement_rules = requirement_rules
         
+        # Bit per food code used by the rules (see _resolve_rules)
+        self._interner = CodeInterner()
+        
+        # (active rule index, required_count) -> violation message or
+        # None; the outcome depends only on these, so each message is
+        # built once
+        self._messages: Dict[Tuple[int, int], Optional[str]] = {}
+        
         # Resolve all pool references to actual food codes
         self._resolve_rules()
     
@@ -60,58 +67,48 @@ class ConditionalRequirementFilter(BaseFilter):
         """
         Resolve all rule definitions to sets of food codes.
         
-        Resolves both if_present and then_require.from fields.
+        Resolves both if_present and then_require.from fields, and
+        keeps each as a code bitmask for _check_rule. The config rule
+        dicts may be shared with other filters, so nothing is written
+        back to them: each active rule gets its own copy carrying
+        _resolved_triggers and _resolved_required, and the masks (which
+        depend on this filter's interner) live in lists on the filter.
         """
+        # Enabled rules that can trigger at all; the only ones checked
+        self._active_rules: List[Dict[str, Any]] = []
+        # Trigger and required-code masks, aligned with _active_rules
+        self._trigger_masks: List[int] = []
+        self._required_masks: List[int] = []
+        
         for rule in self.requirement_rules:
             if not rule.get("enabled", True):
                 continue
 
             # Resolve if_present trigger codes
             if_present = rule.get("if_present", [])
-            rule["_resolved_triggers"] = self._resolve_to_codes(if_present)
+            resolved_triggers = self.resolve_codes(if_present)
             
             # Resolve then_require.from required codes
             then_require = rule.get("then_require", {})
             required_from = then_require.get("from", [])
-            rule["_resolved_required"] = self._resolve_to_codes(required_from)
-    
-    def _resolve_to_codes(self, spec: Any) -> Set[str]:
-        """
-        Resolve a code specification to a set of food codes.
-        
-        Args:
-            spec: Can be:
-                - String (single code): "ot.1a"
-                - String (pool ref): "pool:breakfast_meats"
-                - List of strings: ["ot.1a", "ot.1b"]
-        
-        Returns:
-            Set of food codes
-        """
-        codes = set()
-        
-        if isinstance(spec, str):
-            if spec.startswith("pool:"):
-                # Pool reference - expand it
-                pool_name = spec[5:]  # Remove "pool:" prefix
-                pool_codes = self.thresholds_mgr.expand_pool(pool_name)
-                codes.update(pool_codes)
-            else:
-                # Single food code
-                codes.add(spec)
-        
-        elif isinstance(spec, list):
-            # List of codes or pool refs
-            for item in spec:
-                if isinstance(item, str):
-                    if item.startswith("pool:"):
-                        pool_name = item[5:]
-                        pool_codes = self.thresholds_mgr.expand_pool(pool_name)
-                        codes.update(pool_codes)
-                    else:
-                        codes.add(item)
-        
-        return codes
+            resolved_required = self.resolve_codes(required_from)
+            
+            trigger_mask = self._interner.add(resolved_triggers)
+            if not trigger_mask:
+                # Can never trigger
+                continue
+            self._active_rules.append({
+                **rule,
+                "_resolved_triggers": resolved_triggers,
+                "_resolved_required": resolved_required,
+            })
+            self._trigger_masks.append(trigger_mask)
+            self._required_masks.append(self._interner.add(resolved_required))
+        
+        # Every trigger code of every active rule
+        self._any_trigger_mask = 0
+        for trigger_mask in self._trigger_masks:
+            self._any_trigger_mask |= trigger_mask
     
     def filter_candidates(
         self,
@@ -126,91 +123,106 @@ class ConditionalRequirementFilter(BaseFilter):
         Returns:
             Tuple of (passed_candidates, rejected_candidates)
         """
+        # Food codes of each candidate, as rule-code bitmasks
+        candidate_masks = [
+            self._interner.mask(self.candidate_codes(candidate))
+            for candidate in candidates
+        ]
+        
+        # Only rules some candidate in this batch can trigger
+        batch_mask = 0
+        for candidate_mask in candidate_masks:
+            batch_mask |= candidate_mask
+        rule_indices = [
+            idx for idx, trigger_mask in enumerate(self._trigger_masks)
+            if trigger_mask & batch_mask
+        ]
+        if not rule_indices:
+            return list(candidates), []
+        
         passed = []
         rejected = []
+        # collect_all keeps violating candidates in the passed list
+        on_violation = passed.append if self.collect_all else rejected.append
         
-        for candidate in candidates:
-            # Get food codes in this candidate
-            candidate_codes = self._extract_candidate_codes(candidate)
+        for candidate, candidate_mask in zip(candidates, candidate_masks):
+            # Most candidates trigger no rule at all
+            if not candidate_mask & self._any_trigger_mask:
+                passed.append(candidate)
+                continue
+            
             # Check each conditional rule
             violations = []
-            for rule in self.requirement_rules:
-                if not rule.get("enabled", True):
-                    continue
-                violation = self._check_rule(candidate_codes, rule)
+            for rule_idx in rule_indices:
+                violation = self._check_rule(candidate_mask, rule_idx)
                 if violation:
                     violations.append(violation)
 
             # Handle violations
             if violations:
                 # Add rejection reasons
-                for violation in violations:
-                    candidate["rejection_reasons"].append(violation)
-                
-                if self.collect_all:
-                    passed.append(candidate)
-                else:
-                    rejected.append(candidate)
+                self.add_rejection_reasons(candidate, violations)
+                on_violation(candidate)
             else:
                 passed.append(candidate)
         
         return passed, rejected
     
-    def _extract_candidate_codes(self, candidate: Dict[str, Any]) -> Set[str]:
+    def _check_rule(
+        self,
+        candidate_mask: int,
+        rule_idx: int
+    ) -> Optional[str]:
         """
-        Extract all food codes from candidate items.
+        Check if candidate violates a conditional requirement rule.
         
         Args:
-            candidate: Candidate dict with 'items' field
+            candidate_mask: Bitmask of the candidate's food codes
+            rule_idx: Index of the rule in _active_rules
         
         Returns:
-            Set of food codes (lowercase for matching)
+            Violation message if rule violated, None otherwise
         """
-        codes = set()
-        items = candidate.get("meal", {}).get("items", [])
-        
-        for item in items:
-            code = item.get("code", "")
-            if code:
-                codes.add(code.lower())
+        # Check if any trigger is present
+        if not candidate_mask & self._trigger_masks[rule_idx]:
+            # Rule doesn't apply to this candidate
+            return None
         
-        return codes
+        # Trigger is present, check if required items meet min/max
+        required_count = (candidate_mask & self._required_masks[rule_idx]).bit_count()
+        
+        key = (rule_idx, required_count)
+        try:
+            return self._messages[key]
+        except KeyError:
+            pass
+        
+        message = self._violation_message(
+            self._active_rules[rule_idx], required_count
+        )
+        self._messages[key] = message
+        return message
     
-    def _check_rule(
+    def _violation_message(
         self,
-        candidate_codes: Set[str],
-        rule: Dict[str, Any]
+        rule: Dict[str, Any],
+        required_count: int
     ) -> Optional[str]:
         """
-        Check if candidate violates a conditional requirement rule.
+        Build the violation message for a triggered rule.
         
         Args:
-            candidate_codes: Set of food codes in candidate
-            rule: Requirement rule with _resolved_triggers and _resolved_required
+            rule: Requirement rule whose trigger is present
+            required_count: Number of required items present
         
         Returns:
-            Violation message if rule violated, None otherwise
+            Violation message if min/max not met, None otherwise
         """
-        triggers = rule.get("_resolved_triggers", set())
-        required = rule.get("_resolved_required", set())
         then_require = rule.get("then_require", {})
         min_count = then_require.get("min", 1)
         max_count = then_require.get("max", None)
         rule_name = rule.get("name", "unnamed_rule")
         
-        # Check if any trigger is present
-        triggers_lower = {c.lower() for c in triggers}
-        trigger_present = bool(candidate_codes & triggers_lower)
-        
-        if not trigger_present:
-            # Rule doesn't apply to this candidate
-            return None
-        
-        # Trigger is present, check if required items meet min/max
-        required_lower = {c.lower() for c in required}
-        present_required = candidate_codes & required_lower
-        required_count = len(present_required)
-        
         # Check minimum requirement
         if required_count < min_count:
             return (
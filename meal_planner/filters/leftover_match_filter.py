@@ -6,6 +6,7 @@ Validates that candidates using leftover items match the exact multipliers
 available in inventory.
 """
 from typing import List, Dict, Any, Set, Tuple
+from .base_filter import BaseFilter
 
 
 class LeftoverMatchFilter:
@@ -30,6 +31,12 @@ class LeftoverMatchFilter:
         self.inventory = inventory
         self.allow_under_use = allow_under_use
         
+        # Leftover code -> available multiplier, looked up per item
+        self._leftover_mults = {
+            code: info.get("multiplier", 1.0)
+            for code, info in inventory.get("leftovers", {}).items()
+        }
+        
         # Tolerance for multiplier matching (0.1%)
         self.MATCH_TOLERANCE = 0.001
 
@@ -52,14 +59,14 @@ class LeftoverMatchFilter:
         Returns:
             Tuple of (passed_candidates, rejected_candidates)
         """
+        if not self._leftover_mults:
+            # No leftovers in inventory - nothing to match, all pass
+            return list(candidates), []
+        
         passed = []
         rejected = []
         
         for candidate in candidates:
-            # Initialize rejection reasons if not present
-            if "rejection_reasons" not in candidate:
-                candidate["rejection_reasons"] = []
-            
             # Check leftover usage
             leftover_items = self._extract_leftover_items(candidate)
             
@@ -82,7 +89,7 @@ class LeftoverMatchFilter:
             
             if new_rejection_reasons:
                 # Add new reasons to candidate
-                candidate["rejection_reasons"].extend(new_rejection_reasons)
+                BaseFilter.add_rejection_reasons(candidate, new_rejection_reasons)
                 
                 if self.collect_all:
                     # Continue processing - don't reject yet
@@ -112,15 +119,14 @@ class LeftoverMatchFilter:
             Dict of {code: multiplier} for leftovers only
         """
         leftover_items = {}
-        leftovers = self.inventory.get("leftovers", {})
+        leftover_mults = self._leftover_mults
         
         for item in candidate.get("meal", {}).get("items", []):
             code = item.get("code", "").upper()
-            mult = item.get("mult", 1.0)
             
             # Check if this code is in leftover inventory
-            if code in leftovers:
-                leftover_items[code] = mult
+            if code in leftover_mults:
+                leftover_items[code] = item.get("mult", 1.0)
         
         return leftover_items
     
@@ -140,17 +146,15 @@ class LeftoverMatchFilter:
             Dict with status and reason
             status: "pass", "reject", or "under_use"
         """
-        leftovers = self.inventory.get("leftovers", {})
+        inventory_mult = self._leftover_mults.get(code)
         
-        if code not in leftovers:
+        if inventory_mult is None:
             # Not in inventory - this shouldn't happen if filtering is correct
             return {
                 "status": "reject",
                 "reason": f"leftover_not_found: {code}"
             }
         
-        inventory_mult = leftovers[code].get("multiplier", 1.0)
-        
         # Check for exact match (within tolerance)
         if abs(candidate_mult - inventory_mult) <= self.MATCH_TOLERANCE:
             return {"status": "pass", "reason": ""}
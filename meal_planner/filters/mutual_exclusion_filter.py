@@ -5,8 +5,8 @@ Mutual exclusion filter for meal candidates.
 Enforces mutual exclusion rules where only items from one group
 can be present in a meal.
 """
-from typing import List, Dict, Any, Set, Tuple, Optional
-from .base_filter import BaseFilter
+from typing import List, Dict, Any, Tuple, Optional
+from .base_filter import BaseFilter, CodeInterner
 
 
 class MutualExclusionFilter(BaseFilter):
@@ -40,12 +40,17 @@ class MutualExclusionFilter(BaseFilter):
                 - groups: List of groups (each can be code, list, or pool ref)
                 - policy: "max_one_group" (only this policy for now)
         """
-        super().__init__()
+        super().__init__(thresholds_mgr)
         
         self.meal_type = meal_type
-        self.thresholds_mgr = thresholds_mgr
         self.exclusion_rules = exclusion_rules
         
+        # Bit per food code used by the rules (see _resolve_groups)
+        self._interner = CodeInterner()
+        
+        # (active rule index, present groups) -> violation message, built once
+        self._messages: Dict[Tuple[int, Tuple[int, ...]], str] = {}
+        
         # Resolve all pool references to actual food codes
         self._resolve_groups()
     
@@ -55,62 +60,45 @@ class MutualExclusionFilter(BaseFilter):
     
     def _resolve_groups(self) -> None:
         """
-        Resolve all group definitions to sets of food codes.
+        Resolve all group definitions to sets of food codes, kept as
+        code bitmasks for _check_rule. The config rule dicts may be
+        shared with other filters, so nothing is written back to them:
+        each active rule gets its own copy carrying _resolved_groups,
+        and the masks (which depend on this filter's interner) live in
+        lists on the filter.
         
         Handles:
         - Single codes: "ot.1a" -> {"ot.1a"}
         - Lists: ["ot.1a", "ot.1b"] -> {"ot.1a", "ot.1b"}
         - Pool refs: "pool:breakfast_meats" -> {all codes in pool}
         """
+        # Enabled rules that can be violated at all; the only ones checked
+        self._active_rules: List[Dict[str, Any]] = []
+        # Per-group code masks and their union, aligned with _active_rules
+        self._group_masks: List[List[int]] = []
+        self._any_group_masks: List[int] = []
+        
         for rule in self.exclusion_rules:
             if not rule.get("enabled", True):
                 continue
             resolved_groups = []
             
             for group in rule.get("groups", []):
-                resolved_codes = self._resolve_group_to_codes(group)
+                resolved_codes = self.resolve_codes(group)
                 resolved_groups.append(resolved_codes)
             
-            # Store resolved groups back in rule
-            rule["_resolved_groups"] = resolved_groups
-    
-    def _resolve_group_to_codes(self, group: Any) -> Set[str]:
-        """
-        Resolve a single group definition to a set of food codes.
-        
-        Args:
-            group: Can be:
-                - String (single code): "ot.1a"
-                - String (pool ref): "pool:breakfast_meats"
-                - List of strings: ["ot.1a", "ot.1b"]
-        
-        Returns:
-            Set of food codes
-        """
-        codes = set()
-        
-        if isinstance(group, str):
-            if group.startswith("pool:"):
-                # Pool reference - expand it
-                pool_name = group[5:]  # Remove "pool:" prefix
-                pool_codes = self.thresholds_mgr.expand_pool(pool_name)
-                codes.update(pool_codes)
-            else:
-                # Single food code
-                codes.add(group)
-        
-        elif isinstance(group, list):
-            # List of codes or pool refs
-            for item in group:
-                if isinstance(item, str):
-                    if item.startswith("pool:"):
-                        pool_name = item[5:]
-                        pool_codes = self.thresholds_mgr.expand_pool(pool_name)
-                        codes.update(pool_codes)
-                    else:
-                        codes.add(item)
-        
-        return codes
+            group_masks = [self._interner.add(g) for g in resolved_groups]
+            if sum(1 for mask in group_masks if mask) < 2:
+                # Fewer than two non-empty groups can never be violated
+                continue
+            self._active_rules.append({**rule, "_resolved_groups": resolved_groups})
+            self._group_masks.append(group_masks)
+            
+            # Codes of all groups, to rule out a candidate in one test
+            any_group_mask = 0
+            for group_mask in group_masks:
+                any_group_mask |= group_mask
+            self._any_group_masks.append(any_group_mask)
     
     def filter_candidates(
         self,
@@ -127,95 +115,79 @@ class MutualExclusionFilter(BaseFilter):
         """
         passed = []
         rejected = []
+        # collect_all keeps violating candidates in the passed list
+        on_violation = passed.append if self.collect_all else rejected.append
         
         for candidate in candidates:
-            # Get food codes in this candidate
-            candidate_codes = self._extract_candidate_codes(candidate)
+            # Get food codes in this candidate, as a rule-code bitmask
+            candidate_mask = self._interner.mask(self.candidate_codes(candidate))
+            
+            # The interner only knows group codes, so an empty mask means
+            # no group of any rule is present
+            if not candidate_mask:
+                passed.append(candidate)
+                continue
             
             # Check each exclusion rule
             violations = []
-            for rule in self.exclusion_rules:
-                if not rule.get("enabled", True):
-                    continue
-                violation = self._check_rule(candidate_codes, rule)
+            for rule_idx in range(len(self._active_rules)):
+                violation = self._check_rule(candidate_mask, rule_idx)
                 if violation:
                     violations.append(violation)
             
             # Handle violations
             if violations:
                 # Add rejection reasons
-                for violation in violations:
-                    candidate["rejection_reasons"].append(violation)
-                
-                if self.collect_all:
-                    passed.append(candidate)
-                else:
-                    rejected.append(candidate)
+                self.add_rejection_reasons(candidate, violations)
+                on_violation(candidate)
             else:
                 passed.append(candidate)
         
         return passed, rejected
     
-    def _extract_candidate_codes(self, candidate: Dict[str, Any]) -> Set[str]:
-        """
-        Extract all food codes from candidate items.
-        
-        Args:
-            candidate: Candidate dict with 'items' field
-        
-        Returns:
-            Set of food codes (lowercase for matching)
-        """
-        codes = set()
-        items = candidate.get("meal", {}).get("items", [])
-        
-        for item in items:
-            code = item.get("code", "")
-            if code:
-                codes.add(code.lower())
-        
-        return codes
-    
     def _check_rule(
         self,
-        candidate_codes: Set[str],
-        rule: Dict[str, Any]
+        candidate_mask: int,
+        rule_idx: int
     ) -> Optional[str]:
         """
         Check if candidate violates a mutual exclusion rule.
         
         Args:
-            candidate_codes: Set of food codes in candidate
-            rule: Exclusion rule with _resolved_groups
+            candidate_mask: Bitmask of the candidate's food codes
+            rule_idx: Index of the rule in _active_rules
         
         Returns:
             Violation message if rule violated, None otherwise
         """
-        policy = rule.get("policy", "max_one_group")
-        resolved_groups = rule.get("_resolved_groups", [])
-        rule_name = rule.get("name", "unnamed_rule")
-        
-        if policy != "max_one_group":
+        rule = self._active_rules[rule_idx]
+        if rule.get("policy", "max_one_group") != "max_one_group":
             # Future: support other policies like "max_two_groups"
             return None
         
-        # Count how many groups have at least one item present
-        groups_with_items = 0
-        present_groups = []
+        # No code from any group - nothing to count
+        if not candidate_mask & self._any_group_masks[rule_idx]:
+            return None
+        
+        group_masks = self._group_masks[rule_idx]
         
-        for idx, group_codes in enumerate(resolved_groups):
-            # Check if any code from this group is in the candidate
-            group_codes_lower = {c.lower() for c in group_codes}
-            if candidate_codes & group_codes_lower:
-                groups_with_items += 1
-                present_groups.append(idx + 1)  # 1-indexed for user readability
+        # Groups with at least one item present, 1-indexed for user readability
+        present_groups = tuple(
+            idx + 1 for idx, group_mask in enumerate(group_masks)
+            if candidate_mask & group_mask
+        )
         
         # Violation if more than one group is present
-        if groups_with_items > 1:
-            return (
+        if len(present_groups) <= 1:
+            return None
+        
+        key = (rule_idx, present_groups)
+        message = self._messages.get(key)
+        if message is None:
+            rule_name = rule.get("name", "unnamed_rule")
+            message = self._messages[key] = (
                 f"mutual_exclusion({rule_name}): "
-                f"items from {groups_with_items} groups present "
-                f"(groups {present_groups}), max allowed is 1"
+                f"items from {len(present_groups)} groups present "
+                f"(groups {list(present_groups)}), max allowed is 1"
             )
-        
-        return None
\ No newline at end of file
+        return message
\ No newline at end of file
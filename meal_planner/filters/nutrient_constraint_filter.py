@@ -5,9 +5,12 @@ Nutrient constraint filter for meal candidates.
 Enforces hard and soft nutrient limits from meal_generation templates.
 """
 from typing import List, Dict, Any, Tuple, Optional
-from .base_filter import BaseFilter
-from meal_planner.utils.nutrient_mapping import init_totals_dict, get_filter_totals_mapping, get_nutrient_spec
 
+import numpy as np
+import pandas as pd
+
+from .base_filter import BaseFilter
+from meal_planner.utils.nutrient_mapping import get_filter_totals_mapping, get_nutrient_spec
 
 
 class NutrientConstraintFilter(BaseFilter):
@@ -40,10 +43,9 @@ class NutrientConstraintFilter(BaseFilter):
             meal_type: Meal category (breakfast, lunch, dinner, etc.)
             template_name: Generation template name (e.g., "protein_low_carb")
         """
-        super().__init__()
+        super().__init__(thresholds_mgr)
         
         self.master = master
-        self.thresholds_mgr = thresholds_mgr
         self.meal_type = meal_type
         self.template_name = template_name
         
@@ -54,6 +56,111 @@ class NutrientConstraintFilter(BaseFilter):
         
         # Resolve actual nutrient limits from template references
         self.nutrient_constraints = self._resolve_constraints()
+        
+        # Per-food nutrient rows, only needed when there is something to check
+        self._template_keys: List[str] = []
+        self._code_to_idx: Dict[str, int] = {}
+        self._nutrient_matrix: Optional[np.ndarray] = None
+        if self.nutrient_constraints:
+            self._build_nutrient_matrix()
+            self._build_checks()
+    
+    def _build_nutrient_matrix(self) -> None:
+        """
+        Build the food code x nutrient matrix used by _calculate_totals.
+        
+        Rows follow master order and are found through the master's
+        code_index (the first row wins for a duplicated code, as in
+        lookup_code); columns follow get_filter_totals_mapping(). Missing
+        or non-numeric values are 0.
+        """
+        csv_mapping = get_filter_totals_mapping()
+        self._template_keys = list(csv_mapping.keys())
+        
+        df = self.master.df
+        self._code_to_idx = self.master.code_index
+        
+        matrix = np.zeros((len(df), len(csv_mapping)), dtype=np.float64)
+        for col, csv_key in enumerate(csv_mapping.values()):
+            if csv_key in df.columns:
+                matrix[:, col] = pd.to_numeric(df[csv_key], errors="coerce").fillna(0.0).to_numpy()
+        self._nutrient_matrix = matrix
+    
+    def _build_checks(self) -> None:
+        """
+        Flatten the constraints into the checks run per candidate.
+        
+        _violation_checks holds (nutrient, is_min, limit, message) in the
+        order violations are reported; _soft_checks holds (nutrient,
+        is_min, target, tolerable) for within-tolerance soft bounds.
+        Both are reduced to per-column bound arrays for filter_candidates:
+        a value outside (_reject_lo, _reject_hi) violates, and one outside
+        (_soft_lo, _soft_hi) may be a soft violation. A nutrient the
+        mapping doesn't know reads the always zero column past the last
+        nutrient, as totals.get(nutrient, 0). _rejection_reasons maps each
+        message to its "nutrient:" reason.
+        """
+        self._violation_checks: List[Tuple[str, bool, float, str]] = []
+        self._soft_checks: List[Tuple[str, bool, float, float]] = []
+        
+        zero_col = len(self._template_keys)
+        self._bound_cols = []
+        reject_lo, reject_hi, soft_lo, soft_hi = [], [], [], []
+        
+        for nutrient, constraint in self.nutrient_constraints.items():
+            min_val = constraint.get("min_value")
+            max_val = constraint.get("max_value")
+            min_enforcement = constraint.get("min_enforcement")
+            max_enforcement = constraint.get("max_enforcement")
+            tolerance = constraint.get("tolerance", 1.0)
+            
+            hard_min = min_val is not None and min_enforcement == "hard"
+            hard_max = max_val is not None and max_enforcement == "hard"
+            soft_min = min_val is not None and min_enforcement == "soft"
+            soft_max = max_val is not None and max_enforcement == "soft"
+            lo = hi = None
+            
+            if hard_min:
+                lo = min_val
+                self._violation_checks.append(
+                    (nutrient, True, lo, f"{nutrient}<{lo:.1f}(hard)")
+                )
+            if hard_max:
+                hi = max_val
+                self._violation_checks.append(
+                    (nutrient, False, hi, f"{nutrient}>{hi:.1f}(hard)")
+                )
+            if soft_min:
+                lo = min_val / tolerance
+                self._violation_checks.append(
+                    (nutrient, True, lo, f"{nutrient}<{lo:.1f}(soft_limit)")
+                )
+                self._soft_checks.append((nutrient, True, min_val, lo))
+            if soft_max:
+                hi = max_val * tolerance
+                self._violation_checks.append(
+                    (nutrient, False, hi, f"{nutrient}>{hi:.1f}(soft_limit)")
+                )
+                self._soft_checks.append((nutrient, False, max_val, hi))
+            
+            if nutrient in self._template_keys:
+                self._bound_cols.append(self._template_keys.index(nutrient))
+            else:
+                self._bound_cols.append(zero_col)
+            reject_lo.append(-np.inf if lo is None else lo)
+            reject_hi.append(np.inf if hi is None else hi)
+            soft_lo.append(min_val if soft_min else -np.inf)
+            soft_hi.append(max_val if soft_max else np.inf)
+        
+        self._reject_lo = np.array(reject_lo, dtype=np.float64)
+        self._reject_hi = np.array(reject_hi, dtype=np.float64)
+        self._soft_lo = np.array(soft_lo, dtype=np.float64)
+        self._soft_hi = np.array(soft_hi, dtype=np.float64)
+        
+        self._rejection_reasons = {
+            message: f"nutrient:{message}"
+            for _, _, _, message in self._violation_checks
+        }
     
     def _resolve_constraints(self) -> Optional[Dict[str, Any]]:
         """
@@ -144,63 +251,86 @@ class NutrientConstraintFilter(BaseFilter):
             # No constraints to enforce - all pass
             return candidates, []
         
+        # Totals of every candidate at once, then the bounds as array tests
+        totals = self._calculate_totals(candidates)
+        values = totals[:, self._bound_cols]
+        rejects = ((values < self._reject_lo) | (values > self._reject_hi)).any(axis=1)
+        softs = ((values < self._soft_lo) | (values > self._soft_hi)).any(axis=1)
+        
         passed = []
         rejected = []
+        # collect_all keeps violating candidates in the passed list
+        on_violation = passed.append if self.collect_all else rejected.append
         
-        for candidate in candidates:
-            # Initialize rejection reasons if not present
-            if "rejection_reasons" not in candidate:
-                candidate["rejection_reasons"] = []
-    
-            # Calculate nutrient totals for this candidate
-            totals = self._calculate_totals(candidate)
-            
-            # Check against all constraints
-            violations = self._check_violations(totals)
-            
-            if violations:
+        # Messages are only built for the rows flagged above
+        for candidate, row, reject, soft in zip(candidates, totals, rejects, softs):
+            if reject:
+                violations = self._check_violations(self._totals_dict(row))
                 # Add rejection reasons
-                candidate["rejection_reasons"].extend(
-                    [f"nutrient:{v}" for v in violations]
+                self.add_rejection_reasons(
+                    candidate, [self._rejection_reasons[v] for v in violations]
                 )
-                
-                if self.collect_all:
-                    # Continue processing - don't reject yet
-                    passed.append(candidate)
-                else:
-                    # Reject immediately (current behavior)
-                    rejected.append(candidate)
+                on_violation(candidate)
             else:
                 # Check for soft violations (will be penalized by scorer)
-                soft_violations = self._check_soft_violations(totals)
-                if soft_violations:
-                    candidate["soft_nutrient_violations"] = soft_violations
+                if soft:
+                    soft_violations = self._check_soft_violations(self._totals_dict(row))
+                    if soft_violations:
+                        candidate["soft_nutrient_violations"] = soft_violations
                 
                 passed.append(candidate)
         
-        return passed, rejected    
-
-    def _calculate_totals(self, candidate):
-        items = candidate.get("meal", {}).get("items", [])
-        if not items:
-            return {}
+        return passed, rejected
+    
+    def _calculate_totals(self, candidates: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Sum every candidate's nutrients from the precomputed matrix.
         
-        # Initialize with correct keys from utils
-        totals_dict = init_totals_dict()  # Returns {"calories": 0, "protein": 0, ...}
+        Args:
+            candidates: Candidates with meal.items (code, mult)
         
-        # Get mapping from template keys to CSV keys
-        csv_mapping = get_filter_totals_mapping()  # {"calories": "cal", "protein": "prot_g", ...}
+        Returns:
+            Array of shape (len(candidates), nutrients + 1): one row per
+            candidate, columns as _template_keys plus a trailing zero
+            column. Codes not in master contribute nothing.
+        """
+        code_to_idx = self._code_to_idx
+        owners = []
+        rows = []
+        mults = []
+        for owner, candidate in enumerate(candidates):
+            for item in candidate.get("meal", {}).get("items", []):
+                code = item["code"]
+                # Generated codes are normally uppercase already
+                idx = code_to_idx.get(code)
+                if idx is None:
+                    idx = code_to_idx.get(str(code).upper())
+                if idx is not None:
+                    owners.append(owner)
+                    rows.append(idx)
+                    mults.append(float(item.get("mult", 1.0)))
+        
+        # Weighted item rows, summed per candidate column by column
+        owners = np.asarray(owners, dtype=np.intp)
+        weighted = self._nutrient_matrix[np.asarray(rows, dtype=np.intp)] * np.asarray(mults)[:, None]
+        totals = np.zeros((len(candidates), len(self._template_keys) + 1))
+        for col in range(len(self._template_keys)):
+            totals[:, col] = np.bincount(
+                owners, weights=weighted[:, col], minlength=len(candidates)
+            )
+        return totals
+    
+    def _totals_dict(self, row: np.ndarray) -> Dict[str, float]:
+        """
+        Convert one row of _calculate_totals to a nutrient totals dict.
         
-        for item in items:
-            code = str(item["code"]).upper()
-            mult = float(item.get("mult", 1.0))
-            food = self.master.lookup_code(code)
-            
-            # Use mapping to accumulate - no more hardcoded keys
-            for template_key, csv_key in csv_mapping.items():
-                totals_dict[template_key] += food.get(csv_key, 0) * mult
+        Args:
+            row: Totals row for a single candidate
         
-        return totals_dict
+        Returns:
+            Dict of template nutrient key -> total
+        """
+        return dict(zip(self._template_keys, row.tolist()))
     
     def _check_violations(self, totals: Dict[str, float]) -> List[str]:
         """
@@ -214,35 +344,10 @@ class NutrientConstraintFilter(BaseFilter):
         """
         violations = []
         
-        for nutrient, constraint in self.nutrient_constraints.items():
+        for nutrient, is_min, limit, message in self._violation_checks:
             value = totals.get(nutrient, 0)
-            min_val = constraint.get("min_value")
-            max_val = constraint.get("max_value")
-            min_enforcement = constraint.get("min_enforcement")
-            max_enforcement = constraint.get("max_enforcement")
-            tolerance = constraint.get("tolerance", 1.0)
-            
-            # Check hard minimum
-            if min_val is not None and min_enforcement == "hard":
-                if value < min_val:
-                    violations.append(f"{nutrient}<{min_val:.1f}(hard)")
-            
-            # Check hard maximum
-            if max_val is not None and max_enforcement == "hard":
-                if value > max_val:
-                    violations.append(f"{nutrient}>{max_val:.1f}(hard)")
-            
-            # Check soft minimum beyond tolerance
-            if min_val is not None and min_enforcement == "soft":
-                tolerable_min = min_val / tolerance
-                if value < tolerable_min:
-                    violations.append(f"{nutrient}<{tolerable_min:.1f}(soft_limit)")
-            
-            # Check soft maximum beyond tolerance
-            if max_val is not None and max_enforcement == "soft":
-                tolerable_max = max_val * tolerance
-                if value > tolerable_max:
-                    violations.append(f"{nutrient}>{tolerable_max:.1f}(soft_limit)")
+            if value < limit if is_min else value > limit:
+                violations.append(message)
         
         return violations
     
@@ -258,39 +363,29 @@ class NutrientConstraintFilter(BaseFilter):
         """
         soft_violations = []
         
-        for nutrient, constraint in self.nutrient_constraints.items():
+        for nutrient, is_min, target, tolerable in self._soft_checks:
             value = totals.get(nutrient, 0)
-            min_val = constraint.get("min_value")
-            max_val = constraint.get("max_value")
-            min_enforcement = constraint.get("min_enforcement")
-            max_enforcement = constraint.get("max_enforcement")
-            tolerance = constraint.get("tolerance", 1.0)
             
             # Check soft minimum (below target but within tolerance)
-            if min_val is not None and min_enforcement == "soft":
-                if value < min_val:
-                    tolerable_min = min_val / tolerance
-                    if value >= tolerable_min:  # Within tolerance
-                        soft_violations.append({
-                            "nutrient": nutrient,
-                            "target": min_val,
-                            "value": value,
-                            "type": "below_min",
-                            "deficit": min_val - value
-                        })
+            if is_min:
+                if tolerable <= value < target:
+                    soft_violations.append({
+                        "nutrient": nutrient,
+                        "target": target,
+                        "value": value,
+                        "type": "below_min",
+                        "deficit": target - value
+                    })
             
             # Check soft maximum (above target but within tolerance)
-            if max_val is not None and max_enforcement == "soft":
-                if value > max_val:
-                    tolerable_max = max_val * tolerance
-                    if value <= tolerable_max:  # Within tolerance
-                        soft_violations.append({
-                            "nutrient": nutrient,
-                            "target": max_val,
-                            "value": value,
-                            "type": "above_max",
-                            "excess": value - max_val
-                        })
+            elif target < value <= tolerable:
+                soft_violations.append({
+                    "nutrient": nutrient,
+                    "target": target,
+                    "value": value,
+                    "type": "above_max",
+                    "excess": value - target
+                })
         
         return soft_violations
     
@@ -7,6 +7,7 @@ the candidate pool to only viable options.
 """
 from typing import List, Dict, Any, Set, Tuple, Optional
 import re
+from .base_filter import BaseFilter
 
 
 class PreScoreFilter:
@@ -39,6 +40,26 @@ class PreScoreFilter:
         self.user_prefs = user_prefs
         self.collect_all = False  # Set by caller for accumulation mode
         self.inventory = inventory or {"leftovers": {}, "batch": {}, "rotating": {}}
+        
+        # Exclude locks as one anchored alternation: "DN.*" matches any
+        # code starting with "DN", a plain code must match exactly
+        exclude_locks = self.locks.get("exclude", [])
+        self._exclude_re: Optional[re.Pattern] = None
+        if exclude_locks:
+            self._exclude_re = re.compile("|".join(
+                re.escape(lock[:-2]) if lock.endswith(".*")
+                else re.escape(lock.upper()) + r"\Z"
+                for lock in exclude_locks
+            ))
+        
+        # Include locks as (lock_code, multiplier, prefix matcher or None,
+        # uppercased code), so nothing is re-uppercased per candidate
+        self._include_checks = [
+            (lock_code, lock_mult,
+             re.compile(re.escape(lock_code[:-2])).match if lock_code.endswith(".*") else None,
+             lock_code.upper())
+            for lock_code, lock_mult in self.locks.get("include", {}).items()
+        ]
     
     def set_collect_all(self, collect_all: bool) -> None:
         """Set whether to collect all rejection reasons."""
@@ -59,12 +80,10 @@ class PreScoreFilter:
         """
         filtered = []
         rejected = []
+        # collect_all keeps violating candidates in the filtered list
+        on_violation = filtered.append if self.collect_all else rejected.append
         
         for candidate in candidates:
-            # Initialize rejection reasons if not present
-            if "rejection_reasons" not in candidate:
-                candidate["rejection_reasons"] = []
-            
             # Extract food codes from candidate
             codes = self._extract_codes(candidate)
             
@@ -92,16 +111,9 @@ class PreScoreFilter:
 
             if new_reasons:
                 # Add new reasons to candidate
-                candidate["rejection_reasons"].extend(new_reasons)
-                
-                if self.collect_all:
-                    # Continue processing - don't reject yet
-                    filtered.append(candidate)
-                else:
-                    # Reject immediately (current behavior)
-                    rejected.append(candidate)
+                BaseFilter.add_rejection_reasons(candidate, new_reasons)
+                on_violation(candidate)
             else:
-                candidate["filter_passed"] = True
                 filtered.append(candidate)
 
         return filtered, rejected    
@@ -116,14 +128,8 @@ class PreScoreFilter:
         Returns:
             Set of uppercase food codes
         """
-        codes = set()
         items = candidate.get("meal", {}).get("items", [])
-        
-        for item in items:
-            if "code" in item:
-                codes.add(item["code"].upper())
-        
-        return codes
+        return {item["code"].upper() for item in items if "code" in item}
     
     def _check_lock_filters(self, codes: Set[str]) -> List[str]:
         """
@@ -137,17 +143,17 @@ class PreScoreFilter:
         """
         violations = []
         
-        include_locks = self.locks.get("include", {})
-        exclude_locks = self.locks.get("exclude", [])
-        
-        # Check exclude locks (hard reject with specific code/pattern)
-        if exclude_locks:
-            exclude_violations = self._find_exclude_violations(codes, exclude_locks)
+        # Check exclude locks (hard reject with specific code/pattern);
+        # per-lock reasons only once some code matches at all
+        if self._exclude_re is not None and any(map(self._exclude_re.match, codes)):
+            exclude_violations = self._find_exclude_violations(
+                codes, self.locks.get("exclude", [])
+            )
             violations.extend(exclude_violations)
         
         # Check include locks (must have ALL required items)
-        if include_locks:
-            include_violations = self._find_include_violations(codes, include_locks)
+        if self._include_checks:
+            include_violations = self._find_include_violations(codes)
             violations.extend(include_violations)
         
         return violations
@@ -186,17 +192,12 @@ class PreScoreFilter:
         return violations
 
 
-    def _find_include_violations(
-        self,
-        codes: Set[str],
-        include_locks: Dict[str, float]
-    ) -> List[str]:
+    def _find_include_violations(self, codes: Set[str]) -> List[str]:
         """
         Find which include locks are not satisfied.
         
         Args:
             codes: Food codes in candidate
-            include_locks: Dict of {code: multiplier} that MUST be included
         
         Returns:
             List of violation reasons (e.g., "lock_missing:FI.8")
@@ -204,27 +205,14 @@ class PreScoreFilter:
         violations = []
         
         # Must satisfy ALL include lock entries
-        for lock_code, lock_mult in include_locks.items():
-            found = False
-            
-            if lock_code.endswith(".*"):
+        for lock_code, lock_mult, prefix_match, code_upper in self._include_checks:
+            if prefix_match is not None:
                 # Pattern lock - check if any code matches pattern
-                pattern = lock_code[:-2]
-                for code in codes:
-                    if code.startswith(pattern):
-                        found = True
-                        break
-            else:
-                # Specific code lock
-                if lock_code.upper() in codes:
-                    found = True
-            
-            # If this required item not found, add violation
-            if not found:
-                if lock_code.endswith(".*"):
+                if not any(map(prefix_match, codes)):
                     violations.append(f"lock_missing:{lock_code}")
-                else:
-                    violations.append(f"lock_missing:{lock_code}({lock_mult:g}x)")
+            elif code_upper not in codes:
+                # Specific code lock
+                violations.append(f"lock_missing:{lock_code}({lock_mult:g}x)")
         
         return violations
     
@@ -243,25 +231,8 @@ class PreScoreFilter:
         if not self.user_prefs or not self.user_prefs.is_valid:
             return True
         
-        prefs = self.user_prefs._prefs
-        if not prefs:
-            return True
-        
-        exclude_config = prefs.get("exclude_from_recommendations", {})
-        exclude_patterns = exclude_config.get("patterns", [])
-        exclude_items = exclude_config.get("items", [])
-        
-        # Check patterns
-        for pattern in exclude_patterns:
-            if pattern.endswith("."):
-                # Pattern like "DN."
-                for code in codes:
-                    if code.startswith(pattern):
-                        return False
-        
-        # Check specific items
-        for item in exclude_items:
-            if item.upper() in codes:
+        for code in codes:
+            if self.user_prefs.is_excluded_from_recommendations(code):
                 return False
         
         return True
@@ -20,6 +20,7 @@ from typing import List, Dict, Any, Optional, Tuple, FrozenSet
 from datetime import datetime
 
 from meal_planner.generators.ga_config import GAConfig, MemberOrigin, MemberTier
+from meal_planner.filters.base_filter import EMPTY_REASONS
 
 
 # =============================================================================
@@ -529,7 +530,7 @@ class Member:
 
         return {
             "meal": {"items": items},
-            "rejection_reasons": [],
+            "rejection_reasons": EMPTY_REASONS,
         }
 
     def __repr__(self) -> str:
@@ -0,0 +1,406 @@
+"""
+Tests for meal candidate filters.
+"""
+import pandas as pd
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+from meal_planner.data.thresholds_manager import ThresholdsManager
+from meal_planner.filters import (
+    BaseFilter, CodeInterner, CODE_SET_KEY, EMPTY_REASONS, MutualExclusionFilter,
+    PreScoreFilter, LeftoverMatchFilter, ConditionalRequirementFilter,
+    NutrientConstraintFilter,
+)
+
+
+def _candidate(cid, *codes):
+    """Build a unified candidate with the given food codes."""
+    return {
+        "id": cid,
+        "meal": {"items": [{"code": code, "mult": 1.0} for code in codes]},
+        "rejection_reasons": EMPTY_REASONS,
+    }
+
+
+class _Pools(ThresholdsManager):
+    """Thresholds manager with a fixed pool and no config file."""
+
+    def __init__(self):
+        super().__init__(Path("unused.json"))
+
+    def expand_pool(self, name):
+        return {"fruit": ["FR.1", "FR.2", "FR.3"]}.get(name, [])
+
+
+class _Thresholds:
+    """Thresholds manager stand-in with one breakfast template."""
+
+    def __init__(self, constraints):
+        self.thresholds = {
+            "meal_filters": {"breakfast": {"nutrient_constraints": {"base": constraints}}},
+            "meal_templates": {"breakfast": {"base": {"targets": {
+                "calories": {"min": 300, "max": 500},
+                "protein": {"min": 20},
+            }}}},
+        }
+
+    def get_meal_generation(self):
+        return {"breakfast": {"base": {"targets_ref": "meal_templates.breakfast.base"}}}
+
+
+@pytest.fixture
+def nutrient_filter():
+    """Hard calorie range and a soft protein minimum over a tiny master."""
+    master = SimpleNamespace(
+        df=pd.DataFrame({
+            "code": ["EG.1", "B.1", "b.1"],
+            "cal": [70.0, 150.0, 999.0],
+            "prot_g": [6.0, 4.0, None],
+        }),
+        cols=SimpleNamespace(code="code"),
+        code_index={"EG.1": 0, "B.1": 1},
+    )
+    constraints = {
+        "calories": {"min_enforcement": "hard", "max_enforcement": "hard"},
+        "protein": {"min_enforcement": "soft", "tolerance": 2.0},
+    }
+    return NutrientConstraintFilter(master, _Thresholds(constraints), "breakfast", "base")
+
+
+@pytest.fixture
+def requirement_filter():
+    """Yogurt requires one or two fruits from the pool."""
+    rules = [{
+        "name": "yogurt_fruit",
+        "if_present": "DA.1",
+        "then_require": {"from": "pool:fruit", "min": 1, "max": 2},
+    }]
+    return ConditionalRequirementFilter("breakfast", _Pools(), rules)
+
+
+@pytest.fixture
+def exclusion_filter():
+    """Yogurt and breakfast meat are mutually exclusive."""
+    rules = [{"name": "yogurt_or_meat", "groups": ["DA.1", ["MT.1", "MT.2"]]}]
+    return MutualExclusionFilter("breakfast", None, rules)
+
+
+def test_add_rejection_reasons_copies_placeholder():
+    """Test the shared placeholder is replaced, never modified."""
+    candidate = {"rejection_reasons": EMPTY_REASONS}
+    BaseFilter.add_rejection_reasons(candidate, ["a"])
+    BaseFilter.add_rejection_reasons(candidate, ["b"])
+    assert candidate["rejection_reasons"] == ["a", "b"]
+    assert EMPTY_REASONS == ()
+
+    missing = {}
+    BaseFilter.add_rejection_reasons(missing, ["c"])
+    assert missing["rejection_reasons"] == ["c"]
+
+
+def test_code_interner_masks():
+    """Test rule codes get distinct bits and unknown codes are ignored."""
+    interner = CodeInterner()
+    fruit = interner.add({"fr.1", "fr.2"})
+    dairy = interner.add({"da.1", "fr.1"})
+    assert fruit & dairy == interner.mask({"fr.1"})
+    assert interner.mask({"fr.2", "b.1"}) == interner.mask({"fr.2"})
+    assert interner.mask({"b.1"}) == 0
+
+
+def test_filters_over_shared_rules_keep_own_masks():
+    """Test a second filter built over the same rule dicts leaves the first intact."""
+    rules = [
+        {"name": "yogurt", "if_present": "DA.1", "then_require": {"from": "FR.1"}},
+    ]
+    groups = [{"name": "yogurt_or_meat", "groups": ["DA.1", "MT.1"]}]
+    requirement = ConditionalRequirementFilter("lunch", None, rules)
+    exclusion = MutualExclusionFilter("lunch", None, groups)
+
+    # Later filters intern other codes first, so their bits differ
+    ConditionalRequirementFilter("dinner", None, [
+        {"name": "soup", "if_present": "SO.1", "then_require": {"from": "B.1"}},
+    ] + rules)
+    MutualExclusionFilter("dinner", None, [
+        {"name": "soup_or_salad", "groups": ["SO.1", "VE.1"]},
+    ] + groups)
+    assert not any(key.startswith("_") for rule in rules + groups for key in rule)
+
+    yogurt = _candidate("G1", "DA.1")
+    assert requirement.filter_candidates([yogurt]) == ([], [yogurt])
+    both = _candidate("G2", "DA.1", "MT.1")
+    assert exclusion.filter_candidates([both]) == ([], [both])
+
+
+def test_mutual_exclusion_rejects(exclusion_filter):
+    """Test only candidates mixing groups are rejected."""
+    ok = _candidate("G1", "DA.1", "FR.1")
+    bad = _candidate("G2", "da.1", "MT.2")
+    passed, rejected = exclusion_filter.filter_candidates([ok, bad])
+
+    assert passed == [ok]
+    assert rejected == [bad]
+    assert ok["rejection_reasons"] is EMPTY_REASONS
+    assert len(bad["rejection_reasons"]) == 1
+    assert bad["rejection_reasons"] == [
+        "mutual_exclusion(yogurt_or_meat): items from 2 groups present "
+        "(groups [1, 2]), max allowed is 1"
+    ]
+
+
+def test_mutual_exclusion_collect_all(exclusion_filter):
+    """Test collect_all keeps violating candidates but records reasons."""
+    exclusion_filter.set_collect_all(True)
+    bad = _candidate("G1", "DA.1", "MT.1")
+    passed, rejected = exclusion_filter.filter_candidates([bad])
+    assert passed == [bad]
+    assert rejected == []
+    assert bad["rejection_reasons"]
+
+
+def test_filter_stats(exclusion_filter):
+    """Test the default stats line, including an empty batch."""
+    assert exclusion_filter.get_filter_stats(8, 6) == "passed 6/8 (75.0%)"
+    assert exclusion_filter.get_filter_stats(0, 0) == "passed 0/0 (0.0%)"
+
+
+def test_pre_score_filter_records_reasons():
+    """Test lock violations are recorded on a placeholder candidate."""
+    locks = {"breakfast": {"include": {}, "exclude": ["DN.*", "FI.8"]}}
+    prescore = PreScoreFilter(locks, "breakfast")
+    ok = _candidate("G1", "B.1")
+    bad = _candidate("G2", "dn.3", "fi.8")
+    passed, rejected = prescore.filter_candidates([ok, bad])
+
+    assert passed == [ok] and rejected == [bad]
+    assert ok["rejection_reasons"] is EMPTY_REASONS
+    assert bad["rejection_reasons"] == ["lock_exclude:DN.*(DN.3)", "lock_exclude:FI.8"]
+
+
+def test_leftover_match_filter_without_leftovers():
+    """Test every candidate passes untouched when there are no leftovers."""
+    candidates = [_candidate("G1", "SO.1"), _candidate("G2", "B.1")]
+    passed, rejected = LeftoverMatchFilter({"leftovers": {}}).filter_candidates(candidates)
+    assert passed == candidates and rejected == []
+    assert all(c["rejection_reasons"] is EMPTY_REASONS for c in candidates)
+
+
+def test_leftover_match_filter_tolerance_and_under_use():
+    """Test the match tolerance and the optional under-use pass."""
+    inventory = {"leftovers": {"SO.1": {"multiplier": 1.5}, "RI.2": {}}}
+    exact = _candidate("G1", "SO.1", "RI.2")
+    exact["meal"]["items"][0]["mult"] = 1.5005
+    under = _candidate("G2", "SO.1")
+    under["meal"]["items"][0]["mult"] = 0.75
+
+    passed, rejected = LeftoverMatchFilter(inventory).filter_candidates([exact, under])
+    assert passed == [exact] and rejected == [under]
+    assert under["rejection_reasons"][0].startswith("leftover_mismatch: SO.1")
+
+    lenient = LeftoverMatchFilter(inventory, allow_under_use=True)
+    under["rejection_reasons"] = EMPTY_REASONS
+    assert lenient.filter_candidates([under]) == ([under], [])
+    assert under["leftover_under_use"] == ["SO.1: uses 0.75x of 1.5x (50.0% waste)"]
+
+
+def test_leftover_match_filter_records_reasons():
+    """Test a leftover over-use is recorded on a placeholder candidate."""
+    inventory = {"leftovers": {"SO.1": {"multiplier": 1.0}}}
+    leftovers = LeftoverMatchFilter(inventory)
+    ok = _candidate("G1", "so.1")
+    bad = _candidate("G2", "SO.1")
+    bad["meal"]["items"][0]["mult"] = 2.0
+    passed, rejected = leftovers.filter_candidates([ok, bad])
+
+    assert passed == [ok] and rejected == [bad]
+    assert ok["rejection_reasons"] is EMPTY_REASONS
+    assert bad["rejection_reasons"][0].startswith("leftover_overuse: SO.1")
+
+
+def test_rule_codes_resolved_lowercase(requirement_filter):
+    """Test resolved rule sets are lowercased once, pools included."""
+    rule = requirement_filter._active_rules[0]
+    assert rule["_resolved_triggers"] == {"da.1"}
+    assert rule["_resolved_required"] == {"fr.1", "fr.2", "fr.3"}
+
+
+def test_conditional_requirement_min_max(requirement_filter):
+    """Test the trigger enforces both the min and max counts."""
+    none = _candidate("G1", "DA.1")
+    ok = _candidate("G2", "da.1", "fr.2")
+    many = _candidate("G3", "DA.1", "FR.1", "FR.2", "FR.3")
+    untriggered = _candidate("G4", "B.1")
+    passed, rejected = requirement_filter.filter_candidates([none, ok, many, untriggered])
+
+    assert passed == [ok, untriggered]
+    assert rejected == [none, many]
+    assert "need at least 1" in none["rejection_reasons"][0]
+    assert "max allowed is 2" in many["rejection_reasons"][0]
+
+    # Identical violations share one message string
+    again = _candidate("G5", "DA.1")
+    requirement_filter.filter_candidates([again])
+    assert again["rejection_reasons"][0] is none["rejection_reasons"][0]
+
+
+def test_candidate_codes_shared_across_filters(requirement_filter, exclusion_filter):
+    """Test a candidate's codes are extracted once for the whole pipeline."""
+    candidate = _candidate("G1", "DA.1", "FR.1")
+    candidate["meal"]["items"].append({"mult": 1.0})
+    requirement_filter.filter_candidates([candidate])
+    codes = candidate[CODE_SET_KEY]
+    assert codes == {"da.1", "fr.1"}
+
+    exclusion_filter.filter_candidates([candidate])
+    assert BaseFilter.candidate_codes(candidate) is codes
+
+
+def test_only_active_rules_are_checked():
+    """Test disabled and never-violable rules are dropped up front."""
+    rules = [
+        {"name": "off", "enabled": False, "groups": ["DA.1", "MT.1"]},
+        {"name": "single", "groups": ["DA.1", []]},
+        {"name": "on", "groups": ["DA.1", "MT.1"]},
+    ]
+    exclusion = MutualExclusionFilter("breakfast", None, rules)
+    assert [r["name"] for r in exclusion._active_rules] == ["on"]
+    assert exclusion._active_rules[0]["_resolved_groups"] == [{"da.1"}, {"mt.1"}]
+
+    requirement = ConditionalRequirementFilter("breakfast", _Pools(), [
+        {"name": "no_trigger", "if_present": [], "then_require": {"from": "FR.1"}},
+        {"name": "off", "enabled": False, "if_present": "DA.1"},
+    ])
+    assert requirement._active_rules == []
+    candidate = _candidate("G1", "DA.1")
+    assert requirement.filter_candidates([candidate]) == ([candidate], [])
+
+
+def test_untriggered_candidates_skip_rule_checks(requirement_filter, exclusion_filter, monkeypatch):
+    """Test candidates with no trigger/group code never reach _check_rule."""
+    def fail(*args):
+        raise AssertionError("_check_rule called")
+
+    candidate = _candidate("G1", "FR.1", "B.1")
+    monkeypatch.setattr(requirement_filter, "_check_rule", fail)
+    monkeypatch.setattr(exclusion_filter, "_check_rule", fail)
+    assert requirement_filter.filter_candidates([candidate]) == ([candidate], [])
+    assert exclusion_filter.filter_candidates([candidate]) == ([candidate], [])
+
+
+def test_rules_share_expanded_pools():
+    """Test each pool is expanded once and shared between rules."""
+    class CountingPools(_Pools):
+        calls = 0
+
+        def expand_pool(self, name):
+            CountingPools.calls += 1
+            return super().expand_pool(name)
+
+    rules = [
+        {"name": "a", "if_present": "DA.1", "then_require": {"from": "pool:fruit"}},
+        {"name": "b", "if_present": ["pool:fruit"], "then_require": {"from": "pool:fruit"}},
+    ]
+    requirement = ConditionalRequirementFilter("breakfast", CountingPools(), rules)
+    assert CountingPools.calls == 1
+    active = requirement._active_rules
+    assert active[0]["_resolved_required"] is active[1]["_resolved_required"]
+    assert isinstance(active[0]["_resolved_triggers"], frozenset)
+
+
+def test_mutual_exclusion_checks_each_rule_separately():
+    """Test a candidate touching one rule's groups passes the other rule."""
+    rules = [
+        {"name": "yogurt_or_meat", "groups": ["DA.1", "MT.1"]},
+        {"name": "soup_or_salad", "groups": ["SO.1", "VE.1"]},
+    ]
+    exclusion = MutualExclusionFilter("lunch", None, rules)
+    mixed = _candidate("G1", "SO.1", "VE.1", "DA.1")
+    passed, rejected = exclusion.filter_candidates([mixed])
+    assert rejected == [mixed]
+    assert len(mixed["rejection_reasons"]) == 1
+    assert mixed["rejection_reasons"][0].startswith("mutual_exclusion(soup_or_salad)")
+
+
+def test_filters_share_pools_across_meal_types():
+    """Test filters for different meals share the manager's set per pool."""
+    pools = _Pools()
+    rules = [{"name": "a", "if_present": "DA.1", "then_require": {"from": "pool:fruit"}}]
+    breakfast = ConditionalRequirementFilter("breakfast", pools, [dict(rules[0])])
+    lunch = ConditionalRequirementFilter("lunch", pools, [dict(rules[0])])
+    assert (breakfast._active_rules[0]["_resolved_required"]
+            is lunch._active_rules[0]["_resolved_required"]
+            is pools.expand_pool_codes("fruit"))
+
+
+def test_resolve_codes_specs(requirement_filter):
+    """Test single codes, pool refs and mixed lists resolve alike."""
+    resolve = requirement_filter.resolve_codes
+    assert resolve("DA.1") == {"da.1"}
+    assert resolve("pool:fruit") is resolve(["pool:fruit"])
+    assert resolve(["B.1", "pool:fruit", 3]) == {"b.1", "fr.1", "fr.2", "fr.3"}
+    assert resolve(None) == frozenset()
+
+
+def test_rules_untriggered_by_batch_are_skipped(monkeypatch):
+    """Test a rule no candidate in the batch triggers is never checked."""
+    rules = [
+        {"name": "yogurt", "if_present": "DA.1", "then_require": {"from": "FR.1"}},
+        {"name": "soup", "if_present": "SO.1", "then_require": {"from": "B.1"}},
+    ]
+    requirement = ConditionalRequirementFilter("lunch", None, rules)
+    checked = []
+    check_rule = requirement._check_rule
+    monkeypatch.setattr(
+        requirement, "_check_rule",
+        lambda mask, idx: checked.append(requirement._active_rules[idx]["name"])
+        or check_rule(mask, idx),
+    )
+
+    soup = _candidate("G1", "SO.1")
+    passed, rejected = requirement.filter_candidates([soup, _candidate("G2", "FR.1")])
+    assert rejected == [soup]
+    assert checked == ["soup"]
+
+    plain = [_candidate("G3", "B.1")]
+    assert requirement.filter_candidates(plain) == (plain, [])
+    assert checked == ["soup"]
+
+
+def test_nutrient_totals_from_matrix(nutrient_filter):
+    """Test totals weight each item's row and skip unknown codes."""
+    meal = _candidate("G1", "eg.1", "B.1", "XX.9")
+    meal["meal"]["items"][0]["mult"] = 2.0
+    totals = nutrient_filter._calculate_totals([_candidate("G0"), meal])
+    assert totals.shape[0] == 2 and not totals[0].any()
+
+    totals = nutrient_filter._totals_dict(totals[1])
+    assert totals["calories"] == pytest.approx(290.0)
+    assert totals["protein"] == pytest.approx(16.0)
+    assert totals["fiber"] == 0.0
+    assert nutrient_filter._calculate_totals([]).shape[0] == 0
+
+
+def test_nutrient_constraint_filter(nutrient_filter):
+    """Test hard bounds reject and soft shortfalls are recorded."""
+    low = _candidate("G1", "EG.1", "B.1")
+    ok = _candidate("G2", "EG.1", "B.1", "B.1")
+    passed, rejected = nutrient_filter.filter_candidates([low, ok])
+
+    assert passed == [ok] and rejected == [low]
+    assert low["rejection_reasons"] == ["nutrient:calories<300.0(hard)"]
+    assert ok["soft_nutrient_violations"][0]["type"] == "below_min"
+
+
+def test_pre_score_filter_lock_patterns():
+    """Test exclude and include locks by exact code and by prefix."""
+    locks = {"lunch": {"include": {"SO.*": 1.0, "b.1": 0.5}, "exclude": ["VE.*", "fi.8"]}}
+    prescore = PreScoreFilter(locks, "lunch")
+    ok = _candidate("G1", "SO.2", "B.1", "FI.80")
+    missing = _candidate("G2", "B.11", "ve.3", "FI.8")
+    passed, rejected = prescore.filter_candidates([ok, missing])
+
+    assert passed == [ok] and rejected == [missing]
+    assert missing["rejection_reasons"] == [
+        "lock_exclude:VE.*(VE.3)", "lock_exclude:fi.8",
+        "lock_missing:SO.*", "lock_missing:b.1(0.5x)",
+    ]
@@ -0,0 +1,45 @@
+"""
+Tests for master food loader.
+"""
+import json
+import pytest
+from meal_planner.data.master_loader import MasterLoader
+
+
+def _entry(code, cal):
+    """Build a minimal valid master.json entry."""
+    macros = {"cal": cal, "prot_g": 1, "carbs_g": 2, "fat_g": 3, "GI": 0, "GL": 0, "sugar_g": 0}
+    return {"code": code, "section": "Test", "description": f"food {code}", "macros": macros}
+
+
+@pytest.fixture
+def master(tmp_path):
+    """Loaded master with two foods."""
+    path = tmp_path / "master.json"
+    path.write_text(json.dumps([_entry("B.1", 100), _entry("eg.2", 70)]), encoding="utf-8")
+    loader = MasterLoader(path)
+    loader.load()
+    return loader
+
+
+def test_lookup_code_case_insensitive(master):
+    """Test lookup by any case and a miss."""
+    assert master.lookup_code("b.1")["cal"] == 100
+    assert master.lookup_code("EG.2")["option"] == "food eg.2"
+    assert master.lookup_code("XX.9") is None
+
+
+def test_lookup_code_after_update(master):
+    """Test the code index follows a rebuilt DataFrame."""
+    assert master.lookup_code("B.1")["cal"] == 100
+    master.delete_entry("B.1")
+    assert master.lookup_code("B.1") is None
+    assert master.lookup_code("EG.2")["cal"] == 70
+
+
+def test_code_index_maps_rows(master):
+    """Test code_index points each uppercase code at its DataFrame row."""
+    index = master.code_index
+    assert sorted(index) == ["B.1", "EG.2"]
+    assert master.df.iloc[index["EG.2"]]["cal"] == 70
+    assert master.code_index is index
@@ -0,0 +1,96 @@
+"""
+Tests for user preferences manager.
+"""
+import json
+import os
+import pytest
+from meal_planner.data.user_preferences_manager import UserPreferencesManager
+
+
+def _write_prefs(path, prefs):
+    """Write a preferences dict to disk."""
+    path.write_text(json.dumps(prefs), encoding="utf-8")
+
+
+@pytest.fixture
+def prefs_file(tmp_path):
+    """Preferences file with a couple of sections."""
+    path = tmp_path / "user_preferences.json"
+    _write_prefs(path, {
+        "command_history_size": {"value": 5},
+        "exclude_from_recommendations": {
+            "patterns": ["dn.", "SO"],
+            "items": [" fi.8 ", "B.1"],
+        },
+    })
+    return path
+
+
+def test_load_creates_default_file(tmp_path):
+    """Test missing file is created with defaults."""
+    path = tmp_path / "missing.json"
+    mgr = UserPreferencesManager(path)
+    assert mgr.load()
+    assert path.exists()
+    assert mgr.is_valid
+
+
+def test_load_skips_unchanged_file(prefs_file):
+    """Test reload is skipped when the file has not changed."""
+    mgr = UserPreferencesManager(prefs_file)
+    assert mgr.load()
+    prefs = mgr._prefs
+    assert mgr.load()
+    assert mgr._prefs is prefs
+
+
+def test_load_picks_up_modified_file(prefs_file):
+    """Test reload re-parses when the file mtime changes."""
+    mgr = UserPreferencesManager(prefs_file)
+    assert mgr.load()
+    assert mgr.get_command_history_size() == 5
+
+    _write_prefs(prefs_file, {"command_history_size": 7})
+    st = prefs_file.stat()
+    os.utime(prefs_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    assert mgr.load()
+    assert mgr.get_command_history_size() == 7
+
+
+def test_load_invalid_json(prefs_file):
+    """Test invalid JSON reports an error."""
+    prefs_file.write_text("{not json", encoding="utf-8")
+    mgr = UserPreferencesManager(prefs_file)
+    assert not mgr.load()
+    assert not mgr.is_valid
+    assert "Invalid JSON" in mgr.get_error_message()
+
+
+def test_is_excluded_from_recommendations(prefs_file):
+    """Test exclusion by exact item and by prefix pattern."""
+    mgr = UserPreferencesManager(prefs_file)
+    assert mgr.load()
+    assert mgr.is_excluded_from_recommendations("FI.8")
+    assert mgr.is_excluded_from_recommendations("B.1")
+    assert mgr.is_excluded_from_recommendations("DN.12")
+    assert not mgr.is_excluded_from_recommendations("B.11")
+    # Patterns without a trailing "." are ignored
+    assert not mgr.is_excluded_from_recommendations("SO.1")
+
+
+def test_is_excluded_without_patterns(tmp_path):
+    """Test exclusion still works when only exact items are configured."""
+    path = tmp_path / "prefs.json"
+    _write_prefs(path, {"exclude_from_recommendations": {"items": ["b.1"]}})
+    mgr = UserPreferencesManager(path)
+    assert mgr.load()
+    assert mgr.is_excluded_from_recommendations("B.1")
+    assert not mgr.is_excluded_from_recommendations("DN.1")
+
+    _write_prefs(path, {"exclude_from_recommendations": {"patterns": ["DN."]}})
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert mgr.load()
+    assert mgr.is_excluded_from_recommendations("DN.1")
+    assert not mgr.is_excluded_from_recommendations("B.1")
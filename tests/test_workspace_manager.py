@@ -0,0 +1,733 @@
+"""
+Tests for workspace manager persistence.
+"""
+import json
+import pytest
+from meal_planner.data import workspace_manager
+from meal_planner.data.workspace_manager import WorkspaceManager
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def mgr(request, tmp_path, monkeypatch):
+    """WorkspaceManager exercised with both JSON backends."""
+    if request.param == "stdlib":
+        monkeypatch.setattr(workspace_manager, "orjson", None)
+    elif workspace_manager.orjson is None:
+        pytest.skip("orjson not installed")
+    return WorkspaceManager(tmp_path / "workspace.json")
+
+
+def _meal(**overrides):
+    """Build a meal entry in workspace format."""
+    meal = {
+        "description": "Eggs and toast",
+        "analyzed_as": None,
+        "created": "2026-01-01T08:00:00",
+        "meal_name": "BREAKFAST",
+        "type": "analyzed",
+        "items": [{"code": "B.1", "mult": 1.0}],
+        "totals": {"cal": 300},
+        "source_date": None,
+        "source_time": None,
+        "parent_id": None,
+        "ancestor_id": None,
+        "modification_log": [],
+        "meets_constraints": True,
+        "history": [],
+        "immutable": False,
+    }
+    meal.update(overrides)
+    return meal
+
+
+def test_load_missing_file(mgr):
+    """Test loading a missing file returns an empty workspace."""
+    ws = mgr.load()
+    assert ws["meals"] == {}
+    assert set(ws["command_history"]) == {"threshold", "analyze", "recommend"}
+    assert set(ws["inventory"]) == {"leftovers", "batch", "rotating"}
+    assert ws["locks"] == {"include": {}, "exclude": []}
+    assert "last_modified" in ws
+
+    # Each empty workspace is independent of the last
+    ws["locks"]["exclude"].append("B.1")
+    ws["command_history"]["analyze"]["default"] = ["a"]
+    fresh = mgr.load()
+    assert fresh["locks"]["exclude"] == []
+    assert fresh["command_history"]["analyze"] == {}
+    assert fresh["meals"] == {} and mgr.load_reco()["generation_state"] == {}
+
+
+def test_save_load_roundtrip(mgr):
+    """Test a saved workspace loads back unchanged."""
+    ws = mgr.load()
+    ws["meals"]["1"] = _meal(description="Café au lait")
+    ws["inventory"]["leftovers"]["SO.1"] = {"multiplier": 1.5}
+    mgr.save(ws)
+
+    loaded = mgr.load()
+    assert loaded["meals"] == ws["meals"]
+    assert loaded["inventory"]["leftovers"] == {"SO.1": {"multiplier": 1.5}}
+
+
+def test_save_writes_readable_json(mgr):
+    """Test the file on disk is plain UTF-8 JSON."""
+    ws = mgr.load()
+    ws["meals"]["1"] = _meal(description="Café")
+    mgr.save(ws)
+
+    data = json.loads(mgr.filepath.read_text(encoding="utf-8"))
+    assert data["meals"]["1"]["description"] == "Café"
+
+
+def test_save_omits_default_meal_fields(mgr):
+    """Test default-valued meal fields are left out on disk and restored on load."""
+    ws = mgr.load()
+    ws["meals"]["1"] = _meal()
+    ws["meals"]["2"] = _meal(parent_id="1", immutable=0, items=None, extra="kept")
+    mgr.save(ws)
+
+    on_disk = json.loads(mgr.filepath.read_text(encoding="utf-8"))["meals"]
+    assert "parent_id" not in on_disk["1"]
+    assert "modification_log" not in on_disk["1"]
+    assert "immutable" not in on_disk["1"]
+    assert on_disk["2"]["parent_id"] == "1"
+    assert on_disk["2"]["immutable"] == 0
+    assert on_disk["2"]["items"] is None
+
+    # Caller's meals are untouched
+    assert "parent_id" in ws["meals"]["1"]
+
+    loaded = mgr.load()
+    assert loaded["meals"] == ws["meals"]
+    assert loaded["meals"]["2"]["immutable"] is not False
+
+    mgr._disk_cache = None  # force a real file read
+    assert mgr.load()["meals"] == ws["meals"]
+
+
+def test_save_is_compact(mgr):
+    """Test auto-saves are single-line JSON."""
+    ws = mgr.load()
+    ws["meals"]["1"] = _meal()
+    mgr.save(ws)
+    data = mgr.filepath.read_bytes()
+    assert b"\n" not in data
+    assert json.loads(data)["meals"]["1"]["description"] == "Eggs and toast"
+
+
+def test_save_is_atomic(mgr, monkeypatch):
+    """Test a failed write leaves the previous file and no temp file."""
+    ws = mgr.load()
+    ws["meals"]["1"] = _meal()
+    mgr.save(ws)
+    before = mgr.filepath.read_bytes()
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(workspace_manager.os, "replace", fail)
+    ws["meals"]["2"] = _meal()
+    mgr.save(ws)
+
+    assert mgr.filepath.read_bytes() == before
+    assert list(mgr.filepath.parent.iterdir()) == [mgr.filepath]
+
+
+def test_save_skips_unchanged_content(mgr, monkeypatch):
+    """Test saving identical content again does not rewrite the file."""
+    ws = mgr.load()
+    ws["meals"]["1"] = _meal()
+    mgr.save(ws)
+
+    writes = []
+    real_write = workspace_manager._write_atomic
+    monkeypatch.setattr(workspace_manager, "_write_atomic",
+                        lambda path, payload: (writes.append(path), real_write(path, payload)))
+
+    mgr._last_ts_mono = None  # force a new timestamp
+    mgr.save(ws)
+    assert writes == []
+
+    ws["meals"]["1"]["description"] = "Changed"
+    mgr.save(ws)
+    assert writes == [mgr.filepath]
+
+    # A file deleted or edited outside the app is written again
+    mgr.filepath.unlink()
+    mgr.save(ws)
+    assert list(mgr.load()["meals"]) == ["1"]
+
+    mgr.filepath.write_text(json.dumps({"meals": {}}), encoding="utf-8")
+    mgr.save(ws)
+    assert len(writes) == 3
+    assert list(mgr.load()["meals"]) == ["1"]
+
+    # clear() removes the file, so the next save must write again
+    mgr.clear()
+    mgr.save(ws)
+    assert mgr.filepath.exists()
+
+
+def test_write_atomic_handles_short_writes(tmp_path, monkeypatch):
+    """Test partial os.write calls are continued until done."""
+    real_write = workspace_manager.os.write
+    monkeypatch.setattr(workspace_manager.os, "write",
+                        lambda fd, data: real_write(fd, data[:3]))
+    path = tmp_path / "out.json"
+    workspace_manager._write_atomic(path, b'{"meals": {}}')
+    assert path.read_bytes() == b'{"meals": {}}'
+
+
+def test_save_timestamps_coalesce(mgr, monkeypatch):
+    """Test back-to-back saves share a timestamp until the window passes."""
+    clock = [100.0]
+    monkeypatch.setattr(workspace_manager.time, "monotonic", lambda: clock[0])
+
+    first = mgr._now_iso()
+    clock[0] += 0.01
+    assert mgr._now_iso() == first
+
+    clock[0] += 1.0
+    mgr.save(mgr.load())
+    data = json.loads(mgr.filepath.read_text(encoding="utf-8"))
+    assert data["last_modified"] == mgr._now_iso()
+
+
+def test_load_after_save_skips_file_read(mgr, monkeypatch):
+    """Test load() reuses the saved payload until the file changes."""
+    ws = mgr.load()
+    ws["meals"]["1"] = _meal()
+    mgr.save(ws)
+
+    reads = []
+    real_load_file = workspace_manager._load_file
+    monkeypatch.setattr(workspace_manager, "_load_file",
+                        lambda path: (reads.append(path), real_load_file(path))[1])
+
+    first = mgr.load()
+    assert first["meals"] == ws["meals"]
+    assert reads == []
+
+    # Each load returns an independent dict
+    first["meals"].clear()
+    assert list(mgr.load()["meals"]) == ["1"]
+
+    # A change made outside the manager is picked up
+    mgr.filepath.write_text(json.dumps({"meals": {"9": _meal()}}), encoding="utf-8")
+    assert list(mgr.load()["meals"]) == ["9"]
+    assert reads == [mgr.filepath]
+
+
+def test_save_drops_reco_data(mgr):
+    """Test reco keys are never persisted in the main workspace."""
+    ws = mgr.load()
+    ws["generated_candidates"] = {"candidates": []}
+    mgr.save(ws)
+
+    data = json.loads(mgr.filepath.read_text(encoding="utf-8"))
+    assert "generated_candidates" not in data
+
+
+def test_load_fills_missing_sections(mgr):
+    """Test older files get the newer sections added on load."""
+    mgr.filepath.write_text(json.dumps({
+        "meals": {"1": _meal()},
+        "command_history": {"analyze": {"default": ["x"]}},
+        "locks": {"include": {"B.1": 1.0}},
+    }), encoding="utf-8")
+
+    ws = mgr.load()
+    assert ws["meals"]["1"]["description"] == "Eggs and toast"
+    assert ws["command_history"]["analyze"] == {"default": ["x"]}
+    assert ws["command_history"]["threshold"] == {}
+    assert ws["inventory"] == {"leftovers": {}, "batch": {}, "rotating": {}}
+    assert ws["locks"] == {"include": {"B.1": 1.0}, "exclude": []}
+
+
+def test_load_replaces_malformed_sections(mgr):
+    """Test sections with the wrong type are reset to their defaults."""
+    mgr.filepath.write_text(json.dumps({
+        "meals": [],
+        "inventory": "broken",
+        "command_history": {"threshold": {"default": ["y"]}, "analyze": []},
+        "locks": {"include": {"B.1": 1}, "exclude": None},
+    }), encoding="utf-8")
+
+    ws = mgr.load()
+    assert ws["meals"] == {}
+    assert ws["inventory"] == {"leftovers": {}, "batch": {}, "rotating": {}}
+    assert ws["command_history"]["threshold"] == {"default": ["y"]}
+    assert ws["command_history"]["analyze"] == {}
+    assert ws["locks"] == {"include": {"B.1": 1}, "exclude": []}
+
+    # Defaults are never shared with the schema table
+    ws["locks"]["exclude"].append("B.1")
+    assert mgr.load()["locks"]["exclude"] == []
+
+
+def test_load_large_file(mgr):
+    """Test files above the memory-map threshold load correctly."""
+    ws = mgr.load()
+    for i in range(1, 400):
+        ws["meals"][str(i)] = _meal(description="x" * 200)
+    mgr.save(ws)
+    assert mgr.filepath.stat().st_size >= workspace_manager._MMAP_MIN_BYTES
+
+    assert mgr.load()["meals"] == ws["meals"]
+
+
+def test_load_missing_file_skips_exists_check(mgr, monkeypatch):
+    """Test a missing file is detected by the open, without an extra stat."""
+    def no_exists(self):
+        raise AssertionError("exists() called")
+
+    monkeypatch.setattr(type(mgr.filepath), "exists", no_exists)
+    assert mgr.load()["meals"] == {}
+    mgr.clear()
+    mgr.clear_reco()
+
+
+def test_load_empty_file(mgr):
+    """Test an empty file yields an empty workspace."""
+    mgr.filepath.write_bytes(b"")
+    assert mgr.load()["meals"] == {}
+
+
+def test_load_corrupted_file(mgr):
+    """Test a corrupted file yields an empty workspace."""
+    mgr.filepath.write_text("{not json", encoding="utf-8")
+    assert mgr.load()["meals"] == {}
+
+
+def test_load_does_not_swallow_interrupts(mgr, monkeypatch):
+    """Test only read/parse errors fall back to an empty workspace."""
+    mgr.filepath.write_text(json.dumps({"meals": {}}), encoding="utf-8")
+
+    def interrupted(path):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(workspace_manager, "_load_file", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        mgr.load()
+
+
+def test_load_does_not_swallow_defaulting_errors(mgr, monkeypatch):
+    """Test a bug after parsing propagates instead of resetting the workspace."""
+    mgr.filepath.write_text(json.dumps({"meals": {}}), encoding="utf-8")
+
+    def broken(data, schema):
+        raise ValueError("bug")
+
+    monkeypatch.setattr(workspace_manager, "_fill_defaults", broken)
+    with pytest.raises(ValueError):
+        mgr.load()
+
+
+def test_convert_roundtrip(mgr):
+    """Test planning workspace conversion in both directions."""
+    ws = mgr.load()
+    ws["meals"] = {"1": _meal(), "3a": _meal(), "N2": _meal(), "N10b": _meal()}
+
+    planning = mgr.convert_to_planning_workspace(ws)
+    assert [c["id"] for c in planning["candidates"]] == ["1", "3a", "N2", "N10b"]
+    assert planning["next_numeric_id"] == 4
+    assert planning["next_invented_id"] == 11
+
+    back = mgr.convert_from_planning_workspace(planning)
+    assert back["meals"] == ws["meals"]
+
+
+def test_convert_from_uses_existing_workspace(mgr, monkeypatch):
+    """Test a caller-supplied workspace provides the non-meal sections."""
+    ws = mgr.load()
+    ws["meals"]["1"] = _meal()
+    ws["locks"]["exclude"].append("B.1")
+    monkeypatch.setattr(mgr, "load", lambda: pytest.fail("load() called"))
+
+    planning = {"candidates": [{"id": "2", "description": "x"}]}
+    back = mgr.convert_from_planning_workspace(planning, existing_workspace=ws)
+    assert list(back["meals"]) == ["2"]
+    assert back["locks"]["exclude"] == ["B.1"]
+    assert list(ws["meals"]) == ["1"]
+
+
+def test_convert_from_uses_cached_sections(mgr, monkeypatch):
+    """Test conversion reuses the last saved sections without a re-read."""
+    ws = mgr.load()
+    mgr.record_command_history(ws, "analyze", "a", "default")
+    mgr.save(ws)
+
+    # Changes after the save are not picked up
+    mgr.record_command_history(ws, "analyze", "b", "default")
+
+    def no_read(path):
+        raise AssertionError("workspace file re-read")
+
+    monkeypatch.setattr(workspace_manager, "_load_file", no_read)
+    planning = {"candidates": [{"id": "1"}]}
+    converted = mgr.convert_from_planning_workspace(planning)
+    assert converted["command_history"]["analyze"] == {"default": ["a"]}
+    assert list(converted["meals"]) == ["1"]
+
+    # The cache itself is never handed out
+    converted["locks"]["exclude"].append("B.1")
+    assert mgr.convert_from_planning_workspace(planning)["locks"]["exclude"] == []
+
+
+def test_convert_from_rereads_externally_edited_file(mgr):
+    """Test cached sections are dropped once the file changes outside the app."""
+    mgr.save(mgr.load())
+    data = json.loads(mgr.filepath.read_text(encoding="utf-8"))
+    data["locks"]["exclude"] = ["FI.8"]
+    data["inventory"]["leftovers"] = {"SO.1": {"multiplier": 1.0}}
+    mgr.filepath.write_text(json.dumps(data), encoding="utf-8")
+
+    converted = mgr.convert_from_planning_workspace({"candidates": []})
+    assert converted["locks"]["exclude"] == ["FI.8"]
+    assert list(converted["inventory"]["leftovers"]) == ["SO.1"]
+
+
+def test_convert_fills_meal_defaults(mgr):
+    """Test missing meal fields get their defaults."""
+    planning = {"candidates": [{"id": "1", "description": "x"}, {"description": "no id"}]}
+    ws = mgr.convert_from_planning_workspace(planning)
+    assert list(ws["meals"]) == ["1"]
+    meal = ws["meals"]["1"]
+    assert meal["items"] == []
+    assert meal["meets_constraints"] is True
+    assert meal["immutable"] is False
+    assert meal["parent_id"] is None
+
+
+def test_convert_preserves_explicit_none(mgr):
+    """Test fields present with a None value are not replaced by defaults."""
+    planning = {"candidates": [{"id": "1", "items": None, "meets_constraints": None}]}
+    meal = mgr.convert_from_planning_workspace(planning)["meals"]["1"]
+    assert meal["items"] is None
+    assert meal["meets_constraints"] is None
+
+
+def test_convert_defaults_are_not_shared(mgr):
+    """Test default lists are fresh per meal."""
+    planning = {"candidates": [{"id": "1"}, {"id": "2"}]}
+    meals = mgr.convert_from_planning_workspace(planning)["meals"]
+    meals["1"]["items"].append({"code": "B.1"})
+    assert meals["2"]["items"] == []
+
+
+def test_convert_ignores_unparseable_ids(mgr):
+    """Test IDs that are not numeric don't affect the next IDs."""
+    ws = mgr.load()
+    ws["meals"] = {"abc": _meal(), "N": _meal(), "7": _meal()}
+    planning = mgr.convert_to_planning_workspace(ws)
+    assert planning["next_numeric_id"] == 8
+    assert planning["next_invented_id"] == 1
+
+
+def test_record_command_history(mgr):
+    """Test history is most-recent-first, de-duplicated and trimmed."""
+    ws = mgr.load()
+    for params in ["a", "b", "c", "a"]:
+        mgr.record_command_history(ws, "analyze", params, "default", max_size=3)
+    assert mgr.get_command_history(ws, "analyze", "default") == ["a", "c", "b"]
+
+    mgr.record_command_history(ws, "analyze", "d", "default", max_size=3)
+    assert mgr.get_command_history(ws, "analyze", "default") == ["d", "a", "c"]
+    assert mgr.get_command_history(ws, "analyze", "default", limit=2) == ["d", "a"]
+    assert mgr.get_command_history(ws, "recommend", "default") == []
+
+    # No copy unless the limit trims the list
+    stored = ws["command_history"]["analyze"]["default"]
+    assert mgr.get_command_history(ws, "analyze", "default") is stored
+    assert mgr.get_command_history(ws, "analyze", "default", limit=5) is stored
+
+
+def test_record_command_history_shrinks_to_max_size(mgr):
+    """Test an over-long history is trimmed to the newest entries."""
+    ws = mgr.load()
+    ws["command_history"]["analyze"]["default"] = ["e", "d", "c", "b", "a"]
+    mgr.record_command_history(ws, "analyze", "b", "default", max_size=3)
+    assert ws["command_history"]["analyze"]["default"] == ["b", "e", "d"]
+    assert type(ws["command_history"]["analyze"]["default"]) is list
+
+
+def test_record_command_history_drops_stored_duplicates(mgr):
+    """Test duplicates already in a stored history are collapsed."""
+    ws = mgr.load()
+    ws["command_history"]["analyze"]["default"] = ["a", "b", "a", "c"]
+    mgr.record_command_history(ws, "analyze", "d", "default", max_size=10)
+    assert ws["command_history"]["analyze"]["default"] == ["d", "a", "b", "c"]
+
+
+def test_append_plan_history(mgr):
+    """Test plan history entries are appended."""
+    ws = mgr.load()
+    ws["meals"]["1"] = _meal()
+    mgr.append_plan_history(ws, "1", "add B.2", "added item")
+    mgr.append_plan_history(ws, "missing", "add B.2", "ignored")
+
+    history = mgr.get_plan_history(ws, "1")
+    assert len(history) == 1
+    assert history[0]["command"] == "add B.2"
+    assert mgr.get_plan_history(ws, "missing") == []
+
+
+def test_plan_history_is_capped(mgr, monkeypatch):
+    """Test the oldest plan history entries are dropped at the cap."""
+    monkeypatch.setattr(WorkspaceManager, "MAX_PLAN_HISTORY", 3)
+    ws = mgr.load()
+    ws["meals"]["1"] = _meal(history=[{"note": str(i)} for i in range(5)])
+    mgr.append_plan_history(ws, "1", "cmd", "new")
+
+    history = mgr.get_plan_history(ws, "1")
+    assert [h["note"] for h in history] == ["3", "4", "new"]
+    assert history is ws["meals"]["1"]["history"]
+
+
+def test_plan_history_timestamp_format(mgr):
+    """Test plan history uses minute resolution from the cached clock."""
+    mgr._last_ts_str = "2026-03-04T05:06:07.123456"
+    mgr._last_ts_mono = workspace_manager.time.monotonic() + 60
+    ws = mgr.load()
+    ws["meals"]["1"] = _meal()
+    mgr.append_plan_history(ws, "1", "add B.2", "added item")
+    assert mgr.get_plan_history(ws, "1")[0]["timestamp"] == "2026-03-04 05:06"
+
+
+def test_generated_candidates(mgr):
+    """Test generated candidates are stored in the reco workspace."""
+    assert mgr.get_raw_candidates_count() == 0
+
+    mgr.set_generated_candidates("breakfast", [{"items": [{"code": "B.1"}]}] * 2)
+    mgr.set_generated_candidates("breakfast", [{"items": []}], cursor=2, append=True)
+
+    gen = mgr.get_generated_candidates()
+    assert [c["id"] for c in gen["candidates"]] == ["G1", "G2", "G3"]
+    assert mgr.get_raw_candidates_count() == 3
+    assert mgr.get_scored_candidates_count() == 0
+    assert not mgr.filepath.exists()
+
+    mgr.clear_generated_candidates()
+    assert mgr.get_generated_candidates() is None
+
+
+def test_set_generated_candidates_metadata(mgr):
+    """Test the batch shares one timestamp and keeps template info."""
+    mgr.set_generated_candidates("lunch", [
+        {"items": [], "generation_method": "template", "template_info": {"name": "t"}},
+        {"items": [], "meal_type": "dinner"},
+    ])
+    first, second = mgr.get_generated_candidates()["candidates"]
+    assert first["generation_metadata"]["method"] == "template"
+    assert first["generation_metadata"]["template_info"] == {"name": "t"}
+    assert second["generation_metadata"]["method"] == "unknown"
+    assert "template_info" not in second["generation_metadata"]
+    assert (first["generation_metadata"]["timestamp"]
+            == second["generation_metadata"]["timestamp"])
+    assert second["meal"]["meal_type"] == "dinner"
+
+
+def test_get_generated_candidate(mgr):
+    """Test lookup by G-ID, including a reordered list."""
+    mgr.set_generated_candidates("lunch", [{"items": []}] * 3)
+    assert mgr.get_generated_candidate("g2")["id"] == "G2"
+    assert mgr.get_generated_candidate("G9") is None
+    assert mgr.get_generated_candidate("X1") is None
+
+    gen = mgr.get_generated_candidates()
+    gen["candidates"].reverse()
+    assert mgr.get_generated_candidate("G1", gen) is gen["candidates"][2]
+
+
+def test_candidate_counts(mgr):
+    """Test counts treat unfiltered/unscored candidates as not passed."""
+    assert mgr.get_candidate_counts() == {"raw": 0, "filtered": 0, "scored": 0}
+
+    mgr.set_generated_candidates("lunch", [{"items": []}] * 3)
+    reco = mgr.load_reco()
+    cands = reco["generated_candidates"]["candidates"]
+    cands[0]["filter_result"] = {"passed": True}
+    cands[1]["filter_result"] = {"passed": False}
+    cands[0]["score_result"] = {"total": 1.0}
+    mgr.save_reco(reco)
+
+    assert mgr.get_candidate_counts() == {"raw": 3, "filtered": 1, "scored": 1}
+    assert mgr.get_filtered_candidates_count() == 1
+
+
+def test_save_reco_skips_unchanged_content(mgr, monkeypatch):
+    """Test re-saving identical reco data does not rewrite the file."""
+    mgr.set_generated_candidates("lunch", [{"items": []}])
+
+    saves = []
+    real_write = workspace_manager._write_atomic
+    monkeypatch.setattr(workspace_manager, "_write_atomic",
+                        lambda path, payload: (saves.append(path), real_write(path, payload)))
+
+    reco = mgr.load_reco()
+    mgr._last_ts_mono = None  # force a new timestamp
+    mgr.save_reco(reco)
+    assert saves == []
+
+    reco["generation_state"] = {"cursor": 1}
+    mgr._last_ts_mono = None
+    stamp = reco["last_modified"]
+    mgr.save_reco(reco)
+    assert saves == [mgr.reco_filepath]
+    assert reco["last_modified"] == stamp  # caller's dict untouched
+
+    # A reco file deleted outside the app is written again
+    mgr.reco_filepath.unlink()
+    mgr.save_reco(reco)
+    assert len(saves) == 2
+    assert mgr.load_reco()["generation_state"] == {"cursor": 1}
+
+    mgr.clear_reco()
+    mgr.save_reco(reco)
+    assert mgr.reco_filepath.exists()
+
+
+def test_transaction_batches_reco_writes(mgr, monkeypatch):
+    """Test reco helpers inside a transaction share one load and one save."""
+    saves = []
+    real_write = workspace_manager._write_atomic
+    monkeypatch.setattr(workspace_manager, "_write_atomic",
+                        lambda path, payload: (saves.append(path), real_write(path, payload)))
+
+    with mgr.transaction():
+        mgr.set_generated_candidates("lunch", [{"items": []}])
+        with mgr.transaction():
+            mgr.set_generated_candidates("lunch", [{"items": []}], cursor=1, append=True)
+        assert mgr.get_raw_candidates_count() == 2
+        assert saves == []
+    assert saves == [mgr.reco_filepath]
+    assert mgr.get_raw_candidates_count() == 2
+
+
+def test_transaction_discards_on_error(mgr):
+    """Test a failing transaction leaves the reco file untouched."""
+    mgr.set_generated_candidates("lunch", [{"items": []}])
+    with pytest.raises(RuntimeError):
+        with mgr.transaction():
+            mgr.clear_generated_candidates()
+            raise RuntimeError("boom")
+    assert mgr.get_raw_candidates_count() == 1
+
+
+def test_migrates_reco_data(mgr):
+    """Test legacy reco data in the main file is moved to the reco file."""
+    mgr.filepath.write_text(json.dumps({
+        "meals": {},
+        "generated_candidates": {"candidates": [{"id": "G1"}]},
+    }), encoding="utf-8")
+
+    ws = mgr.load()
+    assert "generated_candidates" not in ws
+    assert mgr.get_raw_candidates_count() == 1
+
+
+def test_migration_keeps_main_file_if_reco_write_fails(mgr, monkeypatch):
+    """Test a failed reco write doesn't strip the legacy data from disk."""
+    legacy = {"meals": {}, "generated_candidates": {"candidates": [{"id": "G1"}]}}
+    mgr.filepath.write_text(json.dumps(legacy), encoding="utf-8")
+
+    def failing_write(path, payload):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(workspace_manager, "_write_atomic", failing_write)
+    mgr.load()
+    assert json.loads(mgr.filepath.read_text(encoding="utf-8")) == legacy
+    assert not mgr.reco_filepath.exists()
+
+
+def test_candidate_counts_cached_until_file_changes(mgr, monkeypatch):
+    """Test counts come from the last save while the reco file is unchanged."""
+    mgr.set_generated_candidates("lunch", [{"items": []}] * 2)
+
+    loads = []
+    real_loads = workspace_manager._loads
+    monkeypatch.setattr(workspace_manager, "_loads",
+                        lambda data: (loads.append(1), real_loads(data))[1])
+    assert mgr.get_candidate_counts() == {"raw": 2, "filtered": 0, "scored": 0}
+    assert loads == []
+
+    # Inside a transaction the pending dict is counted
+    with mgr.transaction():
+        mgr.set_generated_candidates("lunch", [{"items": []}], cursor=2, append=True)
+        assert mgr.get_raw_candidates_count() == 3
+    assert mgr.get_raw_candidates_count() == 3
+
+    mgr.reco_filepath.write_text(json.dumps({}), encoding="utf-8")
+    assert mgr.get_raw_candidates_count() == 0
+
+
+def test_has_generated_candidates(mgr):
+    """Test the check reflects the section contents, not just the key."""
+    assert not mgr.has_generated_candidates()
+    mgr.set_generated_candidates("lunch", [{"items": []}])
+    assert mgr.has_generated_candidates()
+    mgr.clear_generated_candidates()
+    assert not mgr.has_generated_candidates()
+
+
+def test_load_reco_after_save_skips_file_read(mgr, monkeypatch):
+    """Test reco helpers reuse the saved payload until the file changes."""
+    mgr.set_generated_candidates("lunch", [{"items": []}])
+
+    reads = []
+    real_load_file = workspace_manager._load_file
+    monkeypatch.setattr(workspace_manager, "_load_file",
+                        lambda path: (reads.append(path), real_load_file(path))[1])
+
+    assert mgr.has_generated_candidates()
+    assert mgr.get_candidate_counts()["raw"] == 1
+    assert reads == []
+
+    # Each load returns an independent dict
+    mgr.load_reco()["generated_candidates"].clear()
+    assert mgr.get_generated_candidate("G1") is not None
+
+    # A change made outside the manager is picked up
+    mgr.reco_filepath.write_text(json.dumps({"generation_state": {"cursor": 3}}),
+                                 encoding="utf-8")
+    assert mgr.load_reco()["generation_state"] == {"cursor": 3}
+    assert reads == [mgr.reco_filepath]
+
+
+def test_reco_roundtrip_non_ascii(mgr):
+    """Test the reco file is indented UTF-8 and reads back unchanged."""
+    mgr.set_generated_candidates("lunch", [{"items": [], "description": "crème brûlée"}])
+    text = mgr.reco_filepath.read_text(encoding="utf-8")
+    assert "crème brûlée" in text
+    assert '\n  "generated_candidates"' in text
+
+    cand = mgr.get_generated_candidate("G1")
+    assert cand["meal"]["description"] == "crème brûlée"
+
+
+def test_load_reco_corrupted_file(mgr):
+    """Test a corrupted reco file yields an empty reco workspace."""
+    mgr.reco_filepath.write_text("{not json", encoding="utf-8")
+    assert mgr.load_reco()["generated_candidates"] == {}
+
+
+def test_load_reco_fills_missing_sections(mgr):
+    """Test the reco file gets its sections added on load."""
+    mgr.reco_filepath.write_text(json.dumps({
+        "generated_candidates": {"candidates": [{"id": "G1"}]},
+    }), encoding="utf-8")
+
+    reco = mgr.load_reco()
+    assert reco["generated_candidates"] == {"candidates": [{"id": "G1"}]}
+    assert reco["generation_state"] == {}
+    assert "last_modified" in reco
+
+
+def test_clear(mgr):
+    """Test clear removes the workspace file."""
+    mgr.save(mgr.load())
+    assert mgr.filepath.exists()
+    mgr.clear()
+    assert not mgr.filepath.exists()
+    assert mgr.load()["meals"] == {}